@@ -0,0 +1,106 @@
+"""Compare the single-pass line classifier against the previous Result chain.
+
+Run from the repository root::
+
+    PYTHONPATH=src python benchmarks/bench_line_classifier.py
+"""
+import re
+import time
+
+from serverdb_log_parser_multithreaded.log_parser.line_classifier import LineKind, classify
+from serverdb_log_parser_multithreaded.rop.result import Result
+
+Sync_log_entry_pattern = re.compile(
+    "^(?P<syncdatetime>.*?) INFO \\[(?P<database_name>.*?)\\] \\((?P<sync_mode>.*?)\\) Author\\[(?P<author>.*?)\\] Mod:\\'(?P<modification_type>.*?)\\' Doc ID:(?P<doc_id>.*)"
+)
+Sync_log_entry_error_pattern = re.compile(
+    "^(?P<syncdatetime>.*?) ERROR (?P<error_message>.*)"
+)
+Sync_log_entry_to_be_no_parsed = re.compile(
+    "(Starting to sync|Starting at|Sync from Master done|Sync from Master started|Sync into Master|Stopping the Sync|Ending at)"
+)
+Sync_log_entry_pattern_skipped = re.compile(
+    "^(?P<syncdatetime>.*?) INFO \\[(?P<database_name>.*?)\\] \\((?P<sync_mode>.*?)\\) \\[Skipped\\].(?P<error_message>.*?) Doc ID:(?P<doc_id>.*)"
+)
+
+SAMPLE_LINES = [
+    "2019-03-12 10:15:42.123 INFO [Hull_A] (SYNC FROM) Author[jdoe] Mod:'M' Doc ID:4f1c2a9e-77aa-4c1b-9e0f-1d2c3b4a5f60\n",
+    "2019-03-12 10:15:42.456 INFO [Hull_A] (SYNC INTO) Author[asmith] Mod:'N' Doc ID:0a9b8c7d-6e5f-4a3b-2c1d-0e9f8a7b6c5d\n",
+    "2019-03-12 10:15:43.001 INFO [Hull_A] (SYNC FROM) [Skipped] Locked by another user Doc ID:77aa4c1b-9e0f-1d2c-3b4a-5f604f1c2a9e\n",
+    "2019-03-12 10:15:43.250 ERROR Connection to master lost, retrying\n",
+    "2019-03-12 10:15:40.000 INFO Starting to sync database Hull_A\n",
+    "2019-03-12 10:15:44.000 INFO Sync from Master done\n",
+    "2019-03-12 10:15:45.000 WARN Unexpected response from server\n",
+]
+
+
+class LegacyChain:
+    """The per-line fallback chain used before the classifier, minus storage."""
+
+    def match_sync_entry(self, line):
+        match = Sync_log_entry_pattern.match(line)
+        if match == None:
+            return Result.fail('log entry not matched!')
+        match.group('database_name'), match.group('sync_mode'), match.group('author')
+        match.group('modification_type'), match.group('doc_id'), match.group('syncdatetime')
+        return Result.ok()
+
+    def match_sync_skipped_entry(self, line):
+        match = Sync_log_entry_pattern_skipped.match(line)
+        if match == None:
+            return Result.fail('log entry for skipped not matched!')
+        match.group('syncdatetime'), match.group('error_message'), match.group('sync_mode')
+        return Result.ok()
+
+    def match_sync_error_entry(self, line):
+        match = Sync_log_entry_error_pattern.match(line)
+        if match == None:
+            return Result.fail('log entry for error not matched!')
+        match.group('syncdatetime'), match.group('error_message')
+        return Result.ok()
+
+    def unparsed_data(self, line):
+        match = Sync_log_entry_to_be_no_parsed.findall(line)
+        return Result.ok()
+
+    def parse(self, lines):
+        for line in lines:
+            self.match_sync_entry(line) \
+                .on_failure(lambda: self.match_sync_skipped_entry(line))\
+                .on_failure(lambda: self.match_sync_error_entry(line)) \
+                .on_failure(lambda: self.unparsed_data(line))
+
+
+def parse_with_classifier(lines):
+    for line in lines:
+        kind, match = classify(line)
+        if kind == LineKind.SYNC:
+            match.group('database_name'), match.group('sync_mode'), match.group('author')
+            match.group('modification_type'), match.group('doc_id'), match.group('syncdatetime')
+        elif kind == LineKind.SKIPPED:
+            match.group('syncdatetime'), match.group('skipped_message'), match.group('sync_mode')
+        elif kind == LineKind.ERROR:
+            match.group('syncdatetime'), match.group('error_message')
+
+
+def measure(function, lines, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(lines)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(lines) / best
+
+
+def main():
+    lines = SAMPLE_LINES * 20000
+    legacy = measure(LegacyChain().parse, lines)
+    classifier = measure(parse_with_classifier, lines)
+    print(f"Result chain : {legacy:12,.0f} lines/sec")
+    print(f"Classifier   : {classifier:12,.0f} lines/sec")
+    print(f"Speed-up     : {classifier / legacy:12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
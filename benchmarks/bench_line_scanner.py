@@ -0,0 +1,77 @@
+"""Compare classifying decoded lines against rejecting ignorable lines as bytes first.
+
+Both read the lines from a mapping with the scanner the parser uses.
+
+Run from the repository root::
+
+    PYTHONPATH=src python benchmarks/bench_line_scanner.py
+"""
+import os
+import re
+import tempfile
+import time
+
+from serverdb_log_parser_multithreaded.log_parser.line_classifier import LineKind, Sync_log_entry_to_be_no_parsed, \
+    classify
+from serverdb_log_parser_multithreaded.log_parser.line_scanner import map_file, read_mapped_lines
+from serverdb_log_parser_multithreaded.log_parser.log_parser import Parser
+
+Sync_log_entry_to_be_no_parsed_bytes = re.compile(Sync_log_entry_to_be_no_parsed.pattern.encode())
+
+SAMPLE_LINES = [
+    b"2019-03-12 10:15:40.000 INFO Starting to sync database Hull_A\n",
+    b"2019-03-12 10:15:40.100 INFO Sync from Master started\n",
+    b"2019-03-12 10:15:42.123 INFO [Hull_A] (SYNC FROM) Author[jdoe] Mod:'M' Doc ID:4f1c2a9e-77aa-4c1b-9e0f-1d2c3b4a5f60\n",
+    b"2019-03-12 10:15:43.001 INFO [Hull_A] (SYNC FROM) [Skipped] Locked by another user Doc ID:77aa4c1b-9e0f-1d2c-3b4a-5f604f1c2a9e\n",
+    b"2019-03-12 10:15:43.250 ERROR Connection to master lost, retrying\n",
+    b"2019-03-12 10:15:44.000 INFO Sync from Master done\n",
+    b"2019-03-12 10:15:44.500 INFO Stopping the Sync\n",
+    b"2019-03-12 10:15:45.000 INFO Ending at 10:15:45\n",
+]
+
+
+def decode_first(mapping):
+    """What the parser does: every line is decoded, then classified on the str."""
+    kept = 0
+    for raw_line in read_mapped_lines(mapping, 0, len(mapping)):
+        kind, match = classify(Parser._decode_line(raw_line))
+        kept += kind != LineKind.IGNORED
+    return kept
+
+
+def reject_bytes_first(mapping):
+    """Ignorable lines are rejected with byte checks and only the other lines are decoded."""
+    kept = 0
+    for raw_line in read_mapped_lines(mapping, 0, len(mapping)):
+        if b' INFO [' not in raw_line and b' ERROR ' not in raw_line and \
+                Sync_log_entry_to_be_no_parsed_bytes.search(raw_line):
+            continue
+        kind, match = classify(Parser._decode_line(raw_line))
+        kept += kind != LineKind.IGNORED
+    return kept
+
+
+def measure(function, mapping, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(mapping)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        file_path = os.path.join(folder, 'serverdb_bench.log')
+        with open(file_path, 'wb') as writer:
+            writer.write(b''.join(SAMPLE_LINES) * 50000)
+        size = os.path.getsize(file_path) / (1024 * 1024)
+        with open(file_path, 'rb') as reader, map_file(reader) as mapping:
+            print(f"Lines kept         : {decode_first(mapping):,} of {len(SAMPLE_LINES) * 50000:,}")
+            print(f"Decode first       : {size / measure(decode_first, mapping):10.1f} MB/sec")
+            print(f"Reject bytes first : {size / measure(reject_bytes_first, mapping):10.1f} MB/sec")
+
+
+if __name__ == "__main__":
+    main()
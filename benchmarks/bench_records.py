@@ -0,0 +1,69 @@
+"""Compare buffering LogRecord tuples against mongoengine LogData documents.
+
+Reports the memory held per buffered record and the CPU cost of creating a
+record and turning it into a BSON-ready dict at flush time. Run from the
+repository root::
+
+    PYTHONPATH=src python benchmarks/bench_records.py
+"""
+import datetime
+import time
+import tracemalloc
+
+from bson import ObjectId
+
+from serverdb_log_parser_multithreaded.database.db_schema import FileVersionData, LogData
+from serverdb_log_parser_multithreaded.log_parser.records import LogRecord
+
+COUNT = 50000
+FIELDS = dict(user_name='jdoe', database_name='Hull_A', sync_mode='SYNCFROM', author='jdoe',
+              modification_type='MODIFIED', document_id='4f1c2a9e-77aa-4c1b-9e0f-1d2c3b4a5f60',
+              is_skipped=False, is_error=False)
+
+
+def make_documents(file_version_data, date_time):
+    documents = []
+    for _ in range(COUNT):
+        document = LogData(file_version_data=file_version_data, date_time=date_time, **FIELDS)
+        document.validate()
+        documents.append(document)
+    return documents
+
+
+def make_records(file_version_data, date_time):
+    file_version_id = file_version_data.id
+    return [LogRecord(file_version_id, FIELDS['user_name'], date_time,
+                      database_name=FIELDS['database_name'], sync_mode=FIELDS['sync_mode'],
+                      author=FIELDS['author'], modification_type=FIELDS['modification_type'],
+                      document_id=FIELDS['document_id'], is_skipped=False, is_error=False)
+            for _ in range(COUNT)]
+
+
+def measure(build, convert, file_version_data, date_time):
+    tracemalloc.start()
+    items = build(file_version_data, date_time)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    start = time.perf_counter()
+    convert(build(file_version_data, date_time))
+    elapsed = time.perf_counter() - start
+    return size / COUNT, elapsed / COUNT * 1e6
+
+
+def main():
+    file_version_data = FileVersionData(id=ObjectId(), user_name='jdoe')
+    date_time = datetime.datetime(2019, 3, 12, 10, 15, 42, 123000)
+    document_bytes, document_us = measure(
+        make_documents, lambda documents: [document.to_mongo() for document in documents],
+        file_version_data, date_time)
+    record_bytes, record_us = measure(
+        make_records, lambda records: [record.to_document() for record in records],
+        file_version_data, date_time)
+    print(f"{'':12} {'bytes/record':>14} {'us/record':>12}")
+    print(f"{'LogData':12} {document_bytes:14,.0f} {document_us:12.2f}")
+    print(f"{'LogRecord':12} {record_bytes:14,.0f} {record_us:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Check the import time of the CLI and of a parse worker against a budget.
+
+Every scenario runs in a fresh interpreter with ``-X importtime``; the
+cumulative time of the top-level imports is taken as its startup cost, best
+of ``--repeat`` runs. Exits with status 1 when a scenario is over budget.
+Run from the repository root::
+
+    PYTHONPATH=src python benchmarks/bench_startup.py
+"""
+import argparse
+import subprocess
+import sys
+from typing import List, Tuple
+
+# name, statement run with -X importtime, default budget in milliseconds
+SCENARIOS = [
+    ('cli --help', "import sys; sys.argv = ['serverdb_log_parser_multithreaded', '--help']; "
+                   "import runpy; runpy.run_module('serverdb_log_parser_multithreaded', run_name='__main__')", 80),
+    # what a spawn or forkserver worker imports before it can run a ParseTask
+    ('worker', "import serverdb_log_parser_multithreaded.__main__; "
+               "import serverdb_log_parser_multithreaded.log_parser.log_parser", 250),
+]
+
+
+def import_times(statement: str) -> Tuple[float, List[Tuple[float, str]]]:
+    """Return the total import time in ms and the cumulative ms of every top-level import."""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    top_level = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # nested imports are indented below their parent
+        if not name[1:].startswith(' '):
+            top_level.append((int(cumulative) / 1000, name.strip()))
+    return sum(ms for ms, _ in top_level), top_level
+
+
+def measure(statement: str, repeat: int) -> Tuple[float, List[Tuple[float, str]]]:
+    return min((import_times(statement) for _ in range(repeat)), key=lambda times: times[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the startup import time against a budget")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per scenario, the fastest counts")
+    parser.add_argument('--top', type=int, default=5, help="Number of the slowest imports listed")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Multiply every budget, e.g. on a slower CI machine")
+    args = parser.parse_args()
+
+    over_budget = []
+    for name, statement, budget in SCENARIOS:
+        budget *= args.scale
+        total, top_level = measure(statement, args.repeat)
+        status = 'ok' if total <= budget else 'OVER BUDGET'
+        print(f"{name:<12}: {total:8.1f} ms (budget {budget:.0f} ms) {status}")
+        for ms, module in sorted(top_level, reverse=True)[:args.top]:
+            print(f"    {ms:8.1f} ms  {module}")
+        if total > budget:
+            over_budget.append(name)
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Compare TimestampDecoder against ``datetime.strptime`` on log timestamps.
+
+Run from the repository root::
+
+    PYTHONPATH=src python benchmarks/bench_timestamp.py
+"""
+import datetime
+import time
+
+from serverdb_log_parser_multithreaded.log_parser.timestamp import TIMESTAMP_FORMAT, TimestampDecoder
+
+
+def sample_timestamps(count):
+    start = datetime.datetime(2019, 3, 12, 10, 15, 42, 123000)
+    step = datetime.timedelta(milliseconds=37)
+    return [(start + step * i).strftime(TIMESTAMP_FORMAT)[:-3] for i in range(count)]
+
+
+def decode_with_strptime(values):
+    for value in values:
+        datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def decode_with_decoder(values):
+    decode = TimestampDecoder().decode
+    for value in values:
+        decode(value)
+
+
+def measure(function, values, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(values)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(values) / best
+
+
+def main():
+    values = sample_timestamps(100000)
+    decoder = TimestampDecoder()
+    assert all(decoder.decode(value) == datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
+               for value in values)
+    legacy = measure(decode_with_strptime, values)
+    decoded = measure(decode_with_decoder, values)
+    print(f"strptime          : {legacy:12,.0f} timestamps/sec")
+    print(f"TimestampDecoder  : {decoded:12,.0f} timestamps/sec")
+    print(f"Speed-up          : {decoded / legacy:12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Generate a synthetic ``<folder>/<user>/serverdb_*.log`` tree for the benchmarks.
+
+The lines follow the formats recognised by ``log_parser.line_classifier``:
+SYNC FROM/INTO entries, ``[Skipped]`` entries, ERROR entries, the status
+lines the parser ignores and noise that ends up as unparsed data. The same
+seed always produces the same tree. Run from the repository root::
+
+    PYTHONPATH=src python benchmarks/generate_logs.py /tmp/serverdb_logs --users 4 --files 2 --size 50M
+"""
+import argparse
+import datetime
+import os
+import random
+import uuid
+from typing import Dict, List
+
+LINE_KINDS = ('sync', 'skipped', 'error', 'ignored', 'noise')
+DEFAULT_MIX = {'sync': 80, 'skipped': 5, 'error': 3, 'ignored': 10, 'noise': 2}
+
+DATABASES = ['Hull_A', 'Hull_B', 'Outfitting', 'Piping', 'Structure', 'Electrical']
+AUTHORS = ['jdoe', 'asmith', 'mmiller', 'kjones', 'lchen', 'pnovak', 'rgarcia', 'tkato']
+SKIP_REASONS = ['Locked by another user', 'Document is checked out', 'Newer version on master',
+                'Document was deleted on master']
+ERROR_MESSAGES = ['Connection to master lost, retrying', 'Timeout while waiting for the master',
+                  'Could not write document to the local database', 'Access denied for user']
+NOISE_LINES = ['WARN Unexpected response from server', 'DEBUG Heartbeat sent',
+               'WARN Retrying request in 5 seconds', 'INFO Cache cleaned']
+
+
+def parse_size(value: str) -> int:
+    """Parse a byte count with an optional K, M or G suffix."""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = value.strip().upper().rstrip('B')
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Parse ``kind=weight`` pairs such as ``sync=80,skipped=5,error=3,ignored=10,noise=2``."""
+    mix = dict.fromkeys(LINE_KINDS, 0)
+    for pair in value.split(','):
+        kind, weight = pair.split('=')
+        if kind not in mix:
+            raise argparse.ArgumentTypeError(f"Unknown line kind: {kind}")
+        mix[kind] = int(weight)
+    return mix
+
+
+class LogWriter:
+    """Produces the lines of one user's log, with timestamps that keep increasing."""
+
+    def __init__(self, rng: random.Random, mix: Dict[str, int]):
+        self._rng = rng
+        self._kinds = [kind for kind in LINE_KINDS if mix.get(kind)]
+        self._weights = [mix[kind] for kind in self._kinds]
+        self._time = datetime.datetime(2019, 3, 12, 8, 0) + datetime.timedelta(days=rng.randrange(365))
+        self._database = rng.choice(DATABASES)
+
+    def lines(self, count: int) -> List[str]:
+        kinds = self._rng.choices(self._kinds, self._weights, k=count)
+        return [getattr(self, '_' + kind)() for kind in kinds]
+
+    def _timestamp(self) -> str:
+        self._time += datetime.timedelta(milliseconds=self._rng.randrange(1, 2000))
+        return self._time.strftime('%Y-%m-%d %H:%M:%S.') + f"{self._time.microsecond // 1000:03d}"
+
+    def _doc_id(self) -> str:
+        return str(uuid.UUID(int=self._rng.getrandbits(128), version=4))
+
+    def _mode(self) -> str:
+        return self._rng.choice(('SYNC FROM', 'SYNC INTO'))
+
+    def _sync(self) -> str:
+        return f"{self._timestamp()} INFO [{self._database}] ({self._mode()}) " \
+               f"Author[{self._rng.choice(AUTHORS)}] Mod:'{self._rng.choice('MMMND')}' Doc ID:{self._doc_id()}\n"
+
+    def _skipped(self) -> str:
+        return f"{self._timestamp()} INFO [{self._database}] ({self._mode()}) " \
+               f"[Skipped] {self._rng.choice(SKIP_REASONS)} Doc ID:{self._doc_id()}\n"
+
+    def _error(self) -> str:
+        return f"{self._timestamp()} ERROR {self._rng.choice(ERROR_MESSAGES)}\n"
+
+    def _ignored(self) -> str:
+        timestamp = self._timestamp()
+        choice = self._rng.randrange(7)
+        if choice == 0:
+            self._database = self._rng.choice(DATABASES)
+            return f"{timestamp} INFO Starting to sync database {self._database}\n"
+        return f"{timestamp} INFO " + ('Starting at ' + timestamp[11:19], 'Sync from Master started',
+                                        'Sync from Master done', 'Sync into Master', 'Stopping the Sync',
+                                        'Ending at ' + timestamp[11:19])[choice - 1] + "\n"
+
+    def _noise(self) -> str:
+        if self._rng.random() < 0.5:
+            return f"   at ServerDB.Sync.Worker.Run() in Worker.cs:line {self._rng.randrange(1, 900)}\n"
+        return f"{self._timestamp()} {self._rng.choice(NOISE_LINES)}\n"
+
+
+def generate_tree(folder_path: str, users: int = 4, files: int = 2, size: int = 16 * 1024 ** 2,
+                  mix: Dict[str, int] = None, seed: int = 0) -> List[str]:
+    """Write ``files`` logs of about ``size`` bytes for each of ``users`` users, return their paths."""
+    rng = random.Random(seed)
+    paths = []
+    for user in range(users):
+        user_path = os.path.join(folder_path, f"user{user:02d}")
+        os.makedirs(user_path, exist_ok=True)
+        writer = LogWriter(rng, mix or DEFAULT_MIX)
+        for index in range(files):
+            file_path = os.path.join(user_path, f"serverdb_{index + 1}.log")
+            written = 0
+            with open(file_path, 'w', encoding='utf-8', newline='\n') as log_file:
+                while written < size:
+                    block = ''.join(writer.lines(1000))
+                    log_file.write(block)
+                    written += len(block)
+            paths.append(file_path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic serverdb logs")
+    parser.add_argument('folder_path', help="Folder the <user>/serverdb_*.log tree is written to")
+    parser.add_argument('--users', type=int, default=4, help="Number of user folders")
+    parser.add_argument('--files', type=int, default=2, help="Number of log files per user")
+    parser.add_argument('--size', type=parse_size, default=16 * 1024 ** 2,
+                        help="Approximate size of each file, e.g. 512K, 50M or 1G")
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help="Relative weights of the line kinds, e.g. sync=80,skipped=5,error=3,ignored=10,noise=2")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the random generator")
+    args = parser.parse_args()
+    paths = generate_tree(args.folder_path, args.users, args.files, args.size, args.mix, args.seed)
+    total = sum(os.path.getsize(path) for path in paths)
+    print(f"Wrote {len(paths)} files, {total / 1024 ** 2:.1f} MB to {args.folder_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Measure the Parser hot loop on a serverdb log tree without a live MongoDB.
+
+Every file is parsed end to end by :class:`Parser` into a local sink, then
+read again by cumulative passes that stop after reading the lines, after
+classifying them and after decoding their timestamps. The difference between
+two passes is the time of that stage; ``store`` is what the end-to-end run
+spends beyond the timestamp pass, i.e. building records and writing them.
+Run from the repository root::
+
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --size 32M
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --folder /tmp/serverdb_logs --sink sqlite --json results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from generate_logs import generate_tree, parse_size
+from serverdb_log_parser_multithreaded.log_parser.discovery import find_log_files
+from serverdb_log_parser_multithreaded.log_parser.line_classifier import LineKind, classify
+from serverdb_log_parser_multithreaded.log_parser.line_scanner import map_file, read_mapped_lines
+from serverdb_log_parser_multithreaded.log_parser.log_parser import Parser, ParserOptions, ParseTask
+from serverdb_log_parser_multithreaded.log_parser.timestamp import TimestampDecoder
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+LOCAL_SINKS = ('memory', 'sqlite', 'jsonl', 'parquet')
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read_pass(file_path):
+    with open(file_path, 'rb') as reader, map_file(reader) as mapping:
+        for raw_line in read_mapped_lines(mapping, 0, len(mapping)):
+            pass
+
+
+def classify_pass(file_path):
+    with open(file_path, 'rb') as reader, map_file(reader) as mapping:
+        for raw_line in read_mapped_lines(mapping, 0, len(mapping)):
+            classify(Parser._decode_line(raw_line))
+
+
+def timestamp_pass(file_path):
+    timestamps = TimestampDecoder()
+    with open(file_path, 'rb') as reader, map_file(reader) as mapping:
+        for raw_line in read_mapped_lines(mapping, 0, len(mapping)):
+            kind, match = classify(Parser._decode_line(raw_line))
+            if kind in (LineKind.SYNC, LineKind.SKIPPED, LineKind.ERROR):
+                timestamps.decode(match.group('syncdatetime'))
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(folder_path, options):
+    files = find_log_files(folder_path)
+    totals = {'files': len(files), 'lines': 0, 'bytes': 0, 'parse': 0.0}
+    # the end-to-end runs come first so the peak RSS is theirs
+    for file_path, user_name, stat in files:
+        task = ParseTask(file_path, user_name, 'benchmark', options, stat.st_size)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result, elapsed = timed(Parser(task).parse)
+        totals['lines'] += result.lines
+        totals['bytes'] += result.bytes_read
+        totals['parse'] += elapsed
+    totals['peak_rss_mb'] = peak_rss_mb()
+
+    passes = {'read': read_pass, 'classify': classify_pass, 'timestamp': timestamp_pass}
+    elapsed = dict.fromkeys(passes, 0.0)
+    for file_path, user_name, stat in files:
+        for name, function in passes.items():
+            elapsed[name] += timed(function, file_path)[1]
+    stages = {'read': elapsed['read'],
+              'classify': max(elapsed['classify'] - elapsed['read'], 0.0),
+              'timestamp': max(elapsed['timestamp'] - elapsed['classify'], 0.0),
+              'store': max(totals['parse'] - elapsed['timestamp'], 0.0)}
+    return totals, stages
+
+
+def report(totals, stages):
+    seconds = totals['parse'] or float('nan')
+    print(f"Files        : {totals['files']}")
+    print(f"Lines        : {totals['lines']:,}")
+    print(f"Size         : {totals['bytes'] / 1024 ** 2:,.1f} MB")
+    print(f"Lines/sec    : {totals['lines'] / seconds:,.0f}")
+    print(f"MB/sec       : {totals['bytes'] / 1024 ** 2 / seconds:,.2f}")
+    if totals['peak_rss_mb'] is not None:
+        print(f"Peak RSS     : {totals['peak_rss_mb']:,.1f} MB")
+    print("Stage timings:")
+    for name, stage_seconds in stages.items():
+        print(f"  {name:<10} : {stage_seconds:8.3f} secs {100 * stage_seconds / seconds:5.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the serverdb log parser")
+    parser.add_argument('--folder', dest='folder_path',
+                        help="Existing <user>/serverdb_*.log tree; a synthetic one is generated otherwise")
+    parser.add_argument('--users', type=int, default=2, help="Users of the generated tree")
+    parser.add_argument('--files', type=int, default=2, help="Files per user of the generated tree")
+    parser.add_argument('--size', type=parse_size, default=16 * 1024 ** 2,
+                        help="Size of each generated file, e.g. 512K, 50M or 1G")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the generated tree")
+    parser.add_argument('--sink', choices=LOCAL_SINKS, default='memory',
+                        help="Sink the parsed rows are written to; 'memory' only counts them")
+    parser.add_argument('--flush-size', dest='flush_size', type=int, default=1000)
+    parser.add_argument('--async-pipeline', dest='async_pipeline', action='store_true')
+    parser.add_argument('--compact-layout', dest='compact_layout', action='store_true')
+    parser.add_argument('--mmap', dest='use_mmap', action='store_true')
+    parser.add_argument('--json', dest='json_path', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_path:
+        folder_path = args.folder_path
+        if folder_path is None:
+            folder_path = os.path.join(work_path, 'logs')
+            generate_tree(folder_path, args.users, args.files, args.size, seed=args.seed)
+        output_path = None
+        if args.sink == 'sqlite':
+            output_path = os.path.join(work_path, 'benchmark.db')
+        elif args.sink != 'memory':
+            output_path = os.path.join(work_path, 'output')
+        options = ParserOptions(flush_size=args.flush_size, async_pipeline=args.async_pipeline,
+                                sink=args.sink, output_path=output_path,
+                                compact_layout=args.compact_layout, use_mmap=args.use_mmap)
+        totals, stages = run(folder_path, options)
+
+    report(totals, stages)
+    if args.json_path:
+        with open(args.json_path, 'w') as json_file:
+            json.dump({'options': vars(args), 'totals': totals, 'stages': stages}, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
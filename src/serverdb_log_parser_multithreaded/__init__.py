@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
-from pkg_resources import get_distribution, DistributionNotFound
 
-try:
-    # Change here if project is renamed and does not equal the package name
-    dist_name = __name__
-    __version__ = get_distribution(dist_name).version
-except DistributionNotFound:
-    __version__ = 'unknown'
-finally:
-    del get_distribution, DistributionNotFound
+
+def __getattr__(name):
+    # looked up on first use, importing importlib.metadata is not free
+    if name == '__version__':
+        from importlib.metadata import PackageNotFoundError, version
+        try:
+            # Change here if project is renamed and does not equal the package name
+            return version(__name__)
+        except PackageNotFoundError:
+            return 'unknown'
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,17 +1,19 @@
+from __future__ import annotations
 import argparse
 import sys
 import logging
-import asyncio
-import random
 import os
-from pathlib import Path
-from serverdb_log_parser_multithreaded import __version__
-from serverdb_log_parser_multithreaded.log_parser.log_parser import Parser
-from mongoengine import *
-import multiprocessing as mp
-from multiprocessing import Manager
-from multiprocessing import Queue
 import time
+from typing import TYPE_CHECKING, Iterator, List
+from serverdb_log_parser_multithreaded.storage.sink import SINK_TYPES
+
+if TYPE_CHECKING:
+    from serverdb_log_parser_multithreaded.database.db_schema import FileVersionData
+    from serverdb_log_parser_multithreaded.log_parser.dedup_index import DedupIndex
+    from serverdb_log_parser_multithreaded.log_parser.log_parser import ParserOptions, ParseResult, ParseTask
+
+# The parser, mongoengine and pymongo are imported by the functions that use
+# them, so --help/--version and spawned workers only load what they need.
 
 __author__ = "Sherry Ummen"
 __copyright__ = "Sherry Ummen"
@@ -20,6 +22,17 @@ __license__ = "mit"
 _logger = logging.getLogger(__name__)
 
 
+class VersionAction(argparse.Action):
+    """``--version`` that looks the installed version up only when it is asked for."""
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help=None):
+        super().__init__(option_strings, dest=dest, default=default, nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from serverdb_log_parser_multithreaded import __version__
+        parser.exit(message='serverdb_log_parser_multithreaded {ver}\n'.format(ver=__version__))
+
+
 def parse_args(args):
     """Parse command line parameters
 
@@ -33,8 +46,8 @@ def parse_args(args):
         description="ServerDB log parser")
     parser.add_argument(
         '--version',
-        action='version',
-        version='serverdb_log_parser_multithreaded {ver}'.format(ver=__version__))
+        action=VersionAction,
+        help="show program's version number and exit")
     parser.add_argument(
         '-v',
         '--verbose',
@@ -65,6 +78,158 @@ def parse_args(args):
         '--database',
         dest="database_name",
         help="Name of the database")
+    parser.add_argument(
+        '--flush-size',
+        dest="flush_size",
+        help="Number of parsed documents buffered before a bulk insert",
+        type=int,
+        default=1000)
+    parser.add_argument(
+        '--flush-interval',
+        dest="flush_interval",
+        help="Maximum number of seconds documents stay buffered",
+        type=float,
+        default=5.0)
+    parser.add_argument(
+        '--dedup',
+        dest="dedup",
+        help="How already parsed files are detected: 'quick' compares size, "
+             "mtime and the first/last blocks, 'full' compares the md5 of the content; "
+             "a chunked file is hashed by its chunks as they are parsed and is only "
+             "recognised under the same --chunk-size",
+        choices=['quick', 'full'],
+        default='quick')
+    parser.add_argument(
+        '--chunk-size',
+        dest="chunk_size",
+        help="Size in bytes of the ranges a large file is split into",
+        type=int,
+        default=64 * 1024 * 1024)
+    parser.add_argument(
+        '--chunk-threshold',
+        dest="chunk_threshold",
+        help="Files of at least this many bytes are parsed in chunks by several workers",
+        type=int,
+        default=256 * 1024 * 1024)
+    parser.add_argument(
+        '--checkpoint-interval',
+        dest="checkpoint_interval",
+        help="Seconds between the checkpoints of a file's parse progress; a parse "
+             "interrupted by a crash resumes from the last one on the next run",
+        type=float,
+        default=30.0)
+    parser.add_argument(
+        '--pool-size',
+        dest="pool_size",
+        help="Maximum number of MongoDB connections kept open by each worker",
+        type=int,
+        default=10)
+    parser.add_argument(
+        '--write-concern',
+        dest="write_concern",
+        help="MongoDB write concern used for inserts, e.g. 0, 1 or majority")
+    parser.add_argument(
+        '--bulk-load',
+        dest="bulk_load",
+        help="Drop the LogData secondary indexes before parsing, except the file_version_data "
+             "one purges and resumes use, and build them in one pass once the run ends",
+        action='store_true')
+    parser.add_argument(
+        '--manifest',
+        dest="manifest_path",
+        help="JSON manifest of parsed files (path, user, size, mtime) used instead of "
+             "querying MongoDB to skip unchanged files; updated after the run")
+    parser.add_argument(
+        '--follow',
+        dest="follow",
+        help="Keep running and ingest new lines as log files are created or "
+             "appended to; rows are written at least every --flush-interval seconds",
+        action='store_true')
+    parser.add_argument(
+        '--poll-interval',
+        dest="poll_interval",
+        help="Seconds between checks for appended data in --follow mode",
+        type=float,
+        default=1.0)
+    parser.add_argument(
+        '--async-pipeline',
+        dest="async_pipeline",
+        help="Parse and write to MongoDB concurrently inside each worker",
+        action='store_true')
+    parser.add_argument(
+        '--queue-size',
+        dest="queue_size",
+        help="Maximum number of batches waiting for the writer with --async-pipeline",
+        type=int,
+        default=4)
+    parser.add_argument(
+        '--sink',
+        dest="sink",
+        help="Where parsed rows are written: MongoDB, or a local SQLite file, "
+             "gzipped JSON lines or Parquet files that can be loaded into MongoDB later",
+        choices=SINK_TYPES,
+        default='mongo')
+    parser.add_argument(
+        '-o',
+        '--output',
+        dest="output_path",
+        help="SQLite file or output folder of the local sinks")
+    parser.add_argument(
+        '--compact-layout',
+        dest="compact_layout",
+        help="Store LogData rows as one dictionary-encoded log_data_batch "
+             "document per write batch instead of one document per line",
+        action='store_true')
+    parser.add_argument(
+        '--unparsed-mode',
+        dest="unparsed_mode",
+        help="How lines no pattern matches are stored: 'raw' keeps every line as "
+             "unparsed_data, 'cluster' counts them per template in unparsed_pattern, "
+             "with timestamps, ids and numbers masked",
+        choices=['raw', 'cluster'],
+        default='raw')
+    parser.add_argument(
+        '--rollups',
+        dest="rollups",
+        help="Count the parsed rows per hour, user, database, sync mode and "
+             "modification type and add them to the sync_rollup collection",
+        action='store_true')
+    parser.add_argument(
+        '--deterministic-ids',
+        dest="deterministic_ids",
+        help="Derive the _id of every row from the user, file name, byte offset and content "
+             "of its line, so rows parsed again are skipped as duplicates instead of inserted twice",
+        action='store_true')
+    parser.add_argument(
+        '--mmap',
+        dest="use_mmap",
+        help="Memory map the log files instead of reading them through a buffered stream; "
+             "only for files nothing truncates while they are parsed, which kills the worker",
+        action='store_true')
+    parser.add_argument(
+        '--metrics-json',
+        dest="metrics_json",
+        help="Write the per-file, per-worker and total parse metrics to this JSON file")
+    parser.add_argument(
+        '--metrics-textfile',
+        dest="metrics_textfile",
+        help="Write the total parse metrics to this Prometheus textfile, "
+             "e.g. in the node_exporter textfile collector folder")
+    parser.add_argument(
+        '--time-stages',
+        dest="time_stages",
+        help="Also measure the time spent in the regex and timestamp parsing of every "
+             "line; this slows the hot loop down noticeably",
+        action='store_true')
+    parser.add_argument(
+        '--profile',
+        dest="profile",
+        help="Run the parsers under cProfile and print the merged stats",
+        action='store_true')
+    parser.add_argument(
+        '--profile-output',
+        dest="profile_output",
+        help="Also save the merged cProfile stats to this file, for pstats or snakeviz")
 
     return parser.parse_args(args)
 
@@ -80,59 +245,370 @@ def setup_logging(loglevel):
                         format=logformat, datefmt="%Y-%m-%d %H:%M:%S")
 
 
-def parse_multi_process(folder_path: str, db_name: str):
+class TaskPlan:
+    """Turns the log files found by discovery into ParseTasks while the pool already runs.
+
+    Unchanged files are dropped using the dedup index and files above the
+    chunk threshold are split into chunk tasks sharing one FileVersionData.
+    Every discovered batch is handed out largest task first. A chunked file
+    that grew since it was parsed first gets ``hash_only`` tasks checking
+    its parsed prefix, its tail is split by :meth:`resume_tasks` once they
+    are done.
+    """
+
+    def __init__(self, db_name: str, options: ParserOptions, dedup_index: DedupIndex):
+        self.db_name = db_name
+        self.options = options
+        self.dedup_index = dedup_index
+        self.new_files = []
+        self.skipped = 0
+        # FileVersionData id -> ChunkedFile
+        self.chunked_files = {}
+        # FileVersionData id -> (file_path, user_name, FileVersionData) of the prefixes being checked
+        self.resumed_files = {}
+        self.sink = None
+
+    def tasks(self, folder_path: str) -> Iterator[ParseTask]:
+        from serverdb_log_parser_multithreaded.log_parser.discovery import iter_log_files
+        for batch in iter_log_files(folder_path):
+            tasks = []
+            for file_path, user_name, stat in batch:
+                if self.dedup_index.contains(file_path, user_name, stat.st_size, stat.st_mtime):
+                    self.skipped += 1
+                    continue
+                self.new_files.append((file_path, user_name, stat))
+                tasks += self._plan_file(file_path, user_name, stat)
+            # largest first so a big file does not start last and keep one worker busy alone
+            tasks.sort(key=lambda task: task.size, reverse=True)
+            yield from tasks
+
+    def _plan_file(self, file_path: str, user_name: str, stat: os.stat_result) -> List[ParseTask]:
+        from serverdb_log_parser_multithreaded.log_parser.compression import is_compressed
+        from serverdb_log_parser_multithreaded.log_parser.log_parser import ParseTask, chunk_ranges, \
+            parsed_chunks, prepare_chunked_file
+        from serverdb_log_parser_multithreaded.storage.sink import create_sink
+        # compressed files can only be read from the start, so they are never chunked
+        if stat.st_size < self.options.chunk_threshold or is_compressed(file_path):
+            return [ParseTask(file_path, user_name, self.db_name, self.options, stat.st_size)]
+        if self.sink is None:
+            self.sink = create_sink(self.options.sink, self.db_name, self.options.output_path,
+                                    self.options.pool_size, self.options.write_concern)
+        file_version_data = prepare_chunked_file(file_path, user_name, self.options, self.sink)
+        if file_version_data is None:
+            print(f"File:{file_path} already parsed. Skipping!!")
+            return []
+        if not file_version_data.bytes_parsed:
+            return self._chunk_tasks(file_path, user_name, file_version_data, [])
+        # the workers hash the parsed prefix chunk by chunk instead of the planner reading it all
+        self.resumed_files[file_version_data.id] = (file_path, user_name, file_version_data)
+        return [ParseTask(file_path, user_name, self.db_name, self.options, end - start,
+                          (file_version_data.id, start, end), hash_only=True)
+                for start, end in chunk_ranges(parsed_chunks(file_version_data))]
+
+    def _chunk_tasks(self, file_path: str, user_name: str, file_version_data: FileVersionData,
+                     chunks: List[dict]) -> List[ParseTask]:
+        from serverdb_log_parser_multithreaded.log_parser.log_parser import ChunkedFile, ParseTask, split_file
+        start = chunks[-1]['end'] if chunks else 0
+        ranges = split_file(file_path, self.options.chunk_size, start)
+        self.chunked_files[file_version_data.id] = ChunkedFile(file_version_data, ranges, chunks)
+        return [ParseTask(file_path, user_name, self.db_name, self.options,
+                          end - start, (file_version_data.id, start, end))
+                for start, end in ranges]
+
+    def resume_tasks(self, results: List[ParseResult]) -> List[ParseTask]:
+        """Split the tail of every resumed file whose prefix digests the ``hash_only`` tasks matched.
+
+        Rows written after the last batch of the previous version are purged
+        first. A file whose prefix changed is parsed again from the start in a
+        new version, an interrupted previous version being purged; one whose
+        prefix could not be hashed is left for the next run.
+        """
+        from serverdb_log_parser_multithreaded.log_parser.fingerprint import FileFingerprint
+        from serverdb_log_parser_multithreaded.log_parser.log_parser import ParseStatus, chunk_ranges, \
+            create_file_version_data, parsed_chunks
+        digests = {result.chunk: result.chunk_hash for result in results
+                   if result.chunk and result.status == ParseStatus.HASHED}
+        tasks = []
+        for file_version_id, (file_path, user_name, file_version_data) in self.resumed_files.items():
+            chunks = parsed_chunks(file_version_data)
+            hashed = [digests.get((file_version_id, start, end)) for start, end in chunk_ranges(chunks)]
+            if None in hashed:
+                print(f"File: {file_path} could not be checked, it is left for the next run")
+                continue
+            fingerprint = FileFingerprint.of(file_path)
+            if hashed == [chunk['md5'] for chunk in chunks]:
+                purged = self.sink.purge_file_version(file_version_id, file_version_data.last_batch_id or 0)
+                if file_version_data.is_parsing_complete:
+                    print(f"File: {file_path} grew since it was parsed, "
+                          f"resuming at byte {file_version_data.bytes_parsed}")
+                else:
+                    print(f"File: {file_path} was interrupted, purged {purged} rows "
+                          f"and resuming at byte {file_version_data.bytes_parsed}")
+                file_version_data.file_size = fingerprint.size
+                file_version_data.file_mtime = fingerprint.mtime
+                file_version_data.quick_hash = fingerprint.quick_hash
+                file_version_data.is_parsing_complete = False
+                self.sink.save_file_version(file_version_data)
+                tasks += self._chunk_tasks(file_path, user_name, file_version_data, chunks)
+                continue
+            if not file_version_data.is_parsing_complete:
+                purged = self.sink.purge_file_version(file_version_id)
+                print(f"File: {file_path} was interrupted, purged {purged} rows to parse it again")
+            file_version_data = create_file_version_data(file_path, user_name, fingerprint, self.sink)
+            tasks += self._chunk_tasks(file_path, user_name, file_version_data, [])
+        self.resumed_files = {}
+        tasks.sort(key=lambda task: task.size, reverse=True)
+        return tasks
+
+    def complete_chunked_files(self, results: List[ParseResult]) -> set:
+        """Mark the chunked files whose every chunk was parsed complete, return their FileVersionData ids.
+
+        The rollups and unparsed patterns the chunks counted are written just
+        before. The file hash is derived from the chunk digests; with full
+        dedup a new version whose content was already parsed is purged again.
+        """
+        from serverdb_log_parser_multithreaded.log_parser.fingerprint import FileFingerprint
+        from serverdb_log_parser_multithreaded.log_parser.log_parser import ParseStatus, combine_chunk_hashes
+        from serverdb_log_parser_multithreaded.log_parser.rollups import ROLLUP_COLLECTION, Rollups
+        from serverdb_log_parser_multithreaded.log_parser.unparsed_patterns import UNPARSED_PATTERN_COLLECTION, \
+            UnparsedPatterns
+        chunk_results = {}
+        for result in results:
+            if result.chunk and result.status == ParseStatus.PARSED:
+                chunk_results.setdefault(result.chunk[0], []).append(result)
+        completed = set()
+        for file_version_id, chunked_file in self.chunked_files.items():
+            parsed = chunk_results.get(file_version_id, [])
+            if len(parsed) != len(chunked_file.ranges):
+                continue
+            file_version_data = chunked_file.file_version_data
+            parsed.sort(key=lambda result: result.chunk[1])
+            chunk_hashes = chunked_file.parsed_chunks + \
+                [{'end': result.chunk[2], 'md5': result.chunk_hash} for result in parsed]
+            file_hash = combine_chunk_hashes([chunk['md5'] for chunk in chunk_hashes])
+            if self.options.dedup == 'full' and not chunked_file.parsed_chunks and \
+                    self.sink.find_parsed_file_version(
+                        file_version_data.file_path, file_version_data.user_name,
+                        FileFingerprint(file_version_data.file_size, file_version_data.file_mtime,
+                                        file_version_data.quick_hash), file_hash):
+                self.sink.purge_file_version(file_version_id)
+                print(f"File:{file_version_data.file_path} already parsed. Skipping!!")
+                completed.add(file_version_id)
+                continue
+            rollups = Rollups()
+            patterns = UnparsedPatterns()
+            for result in parsed:
+                if result.rollups is not None:
+                    rollups.add(result.rollups)
+                if result.unparsed_patterns is not None:
+                    patterns.add_patterns(result.unparsed_patterns)
+            if rollups:
+                self.sink.upsert(ROLLUP_COLLECTION, rollups.drain())
+            if patterns:
+                self.sink.upsert(UNPARSED_PATTERN_COLLECTION,
+                                 patterns.drain(file_version_id, file_version_data.user_name))
+            file_version_data.file_hash = file_hash
+            file_version_data.chunk_hashes = chunk_hashes
+            file_version_data.bytes_parsed = chunk_hashes[-1]['end'] if chunk_hashes else 0
+            file_version_data.lines_parsed = (file_version_data.lines_parsed or 0) + \
+                sum(result.lines for result in parsed)
+            # the chunks number their batches on from the same id, a resume keeps the highest
+            file_version_data.last_batch_id = max(
+                [result.last_batch_id or 0 for result in parsed] + [file_version_data.last_batch_id or 0])
+            file_version_data.is_parsing_complete = True
+            self.sink.save_file_version(file_version_data)
+            completed.add(file_version_id)
+        return completed
+
+
+def parse_multi_process(folder_path: str, db_name: str, options: ParserOptions,
+                        manifest_path: str = None) -> List[ParseResult]:
+    import multiprocessing as mp
+    from serverdb_log_parser_multithreaded.database.connection import connect_database, disconnect_database
+    from serverdb_log_parser_multithreaded.log_parser.dedup_index import DedupIndex
+    from serverdb_log_parser_multithreaded.log_parser.log_parser import ParseStatus
     mpl = mp.log_to_stderr()
     mpl.setLevel(logging.INFO)
-    m = Manager()
-    q = m.Queue()
-    path = Path(folder_path)
-    folders = [(x, os.path.basename(x))
-               for x in path.iterdir() if x.is_dir()]
-    files = []
-    for folder in folders:
-        for file in Path.glob(folder[0], 'serverdb_*.log'):
-            q.put((str(file), folder[1], db_name))
-            files.append(q)
-
-    pool = mp.Pool(mp.cpu_count())
-    result = pool.map_async(run_parser, files)
-
-    # monitor loop
-    prev_qsize = q.qsize()
-    while True:
-        if result.ready():
-            break
-        else:
-            size = q.qsize()
-            if prev_qsize != size:
-                print(f"Remaining items to process: {size}")
-            prev_qsize = size
-            time.sleep(1)
 
-    outputs = result.get()
+    if manifest_path:
+        dedup_index = DedupIndex.from_manifest(manifest_path)
+    elif options.sink != 'mongo':
+        dedup_index = DedupIndex()
+    else:
+        connect_database(db_name, options.pool_size, options.write_concern)
+        dedup_index = DedupIndex.from_database()
+        disconnect_database()
+
+    # the pool is forked before the parent connects to mongo for chunked files
+    pool = mp.Pool(mp.cpu_count(), initializer=init_worker,
+                   initargs=(db_name, options))
+    plan = TaskPlan(db_name, options, dedup_index)
+
+    results = []
+    with pool:
+        # the pool takes the tasks while the folders are still being scanned
+        for result in pool.imap_unordered(run_parser, plan.tasks(folder_path)):
+            results.append(result)
+            print(f"[{len(results)}] {format_result(result)}")
+        # the tails of the grown chunked files, once the workers checked their prefixes
+        for result in pool.imap_unordered(run_parser, plan.resume_tasks(results)):
+            results.append(result)
+            print(f"[{len(results)}] {format_result(result)}")
+    print(f"Skipped {plan.skipped} already parsed files")
+
+    # a chunked file is complete only once every one of its chunks was parsed
+    completed = {result.file_path for result in results
+                 if not result.chunk and result.status != ParseStatus.FAILED}
+    completed_chunked = plan.complete_chunked_files(results)
+    completed.update(plan.chunked_files[file_version_id].file_version_data.file_path
+                     for file_version_id in completed_chunked)
+    if plan.sink is not None:
+        plan.sink.close()
+
+    if manifest_path:
+        for file_path, user_name, stat in plan.new_files:
+            if file_path in completed or os.path.abspath(file_path) in completed:
+                dedup_index.add(file_path, user_name, stat.st_size, stat.st_mtime)
+        dedup_index.save(manifest_path)
+
+    statuses = [result.status for result in results]
+    print(f"Parsed: {statuses.count(ParseStatus.PARSED)} "
+          f"Skipped: {statuses.count(ParseStatus.SKIPPED)} "
+          f"Failed: {statuses.count(ParseStatus.FAILED)}")
+    return results
+
+
+def format_result(result: ParseResult) -> str:
+    message = f"{result.status}: {result.file_path}"
+    if result.chunk:
+        message += f" bytes {result.chunk[1]}-{result.chunk[2]}"
+    message += f" ({result.lines} lines in {result.duration:.2f} secs)"
+    if result.error:
+        message += f" {result.error}"
+    return message
+
 
+def run_profiled(profile_dir: str, function, *args):
+    import cProfile
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(function, *args)
+    finally:
+        profile.dump_stats(os.path.join(profile_dir, f"{os.getpid()}-{time.monotonic_ns()}.prof"))
 
-def run_parser(queue):
-    Parser(queue).parse()
+
+def print_profile(profile_dir: str, output_path: str = None):
+    """Merge the stats dumped by :func:`run_profiled` and print the most expensive calls."""
+    import pstats
+    import shutil
+    paths = [os.path.join(profile_dir, name) for name in os.listdir(profile_dir)]
+    if paths:
+        stats = pstats.Stats(*paths)
+        if output_path:
+            stats.dump_stats(output_path)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(30)
+    shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+def init_worker(db_name: str, options: ParserOptions):
+    if options.sink == 'mongo':
+        from serverdb_log_parser_multithreaded.database.connection import connect_database
+        connect_database(db_name, options.pool_size, options.write_concern)
+
+
+def run_parser(task: ParseTask) -> ParseResult:
+    from serverdb_log_parser_multithreaded.log_parser.log_parser import Parser, ParseResult, ParseStatus
+    start = time.perf_counter()
+    try:
+        if task.options.profile_dir:
+            return run_profiled(task.options.profile_dir, Parser(task).parse)
+        return Parser(task).parse()
+    except Exception as e:
+        return ParseResult(task.file_path, task.user_name, ParseStatus.FAILED,
+                           duration=time.perf_counter() - start, chunk=task.chunk,
+                           error=f"{type(e).__name__}: {e}")
 
 
 def main(args):
     args = parse_args(args)
     setup_logging(args.loglevel)
+    if args.sink != 'mongo' and not args.output_path:
+        raise SystemExit(f"--output is required with --sink {args.sink}")
+    if args.deterministic_ids and args.compact_layout:
+        raise SystemExit("--deterministic-ids cannot be used with --compact-layout")
+
+    from serverdb_log_parser_multithreaded.database.connection import connect_database, disconnect_database, \
+        drop_database
+    from serverdb_log_parser_multithreaded.database.indexes import create_indexes, drop_log_data_indexes
+    from serverdb_log_parser_multithreaded.log_parser.follower import LogFollower
+    from serverdb_log_parser_multithreaded.log_parser.log_parser import ParserOptions
+    from serverdb_log_parser_multithreaded.log_parser.metrics import MetricsReport
 
     dbname = "ServerDBLogDataPython"
 
     if args.database_name:
         dbname = args.database_name
 
-    if args.force:
-        from pymongo import MongoClient
-        client = MongoClient()
-        client.drop_database(dbname)
+    use_mongo = args.sink == 'mongo'
+    if args.force and use_mongo:
+        drop_database(dbname)
+
+    if use_mongo:
+        # the parent disconnects again so no client is shared with forked workers
+        connect_database(dbname)
+        if args.bulk_load:
+            drop_log_data_indexes()
+        create_indexes(defer_log_data=args.bulk_load)
+        disconnect_database()
 
     _logger.debug("Scripts starts here")
     start = time.time()
-    parse_multi_process(args.folder_path, dbname)
+    import tempfile
+    profile_dir = tempfile.mkdtemp(prefix='serverdb_profile_') if args.profile else None
+    options = ParserOptions(flush_size=args.flush_size,
+                            flush_interval=args.flush_interval,
+                            dedup=args.dedup,
+                            chunk_size=args.chunk_size,
+                            chunk_threshold=args.chunk_threshold,
+                            checkpoint_interval=args.checkpoint_interval,
+                            pool_size=args.pool_size,
+                            write_concern=args.write_concern,
+                            async_pipeline=args.async_pipeline,
+                            queue_size=args.queue_size,
+                            sink=args.sink,
+                            output_path=args.output_path,
+                            compact_layout=args.compact_layout,
+                            unparsed_mode=args.unparsed_mode,
+                            rollups=args.rollups,
+                            deterministic_ids=args.deterministic_ids,
+                            use_mmap=args.use_mmap,
+                            time_stages=args.time_stages,
+                            profile_dir=profile_dir)
+    try:
+        if args.follow:
+            follower = LogFollower(args.folder_path, dbname, options,
+                                   args.poll_interval)
+            if profile_dir:
+                run_profiled(profile_dir, follower.run)
+            else:
+                follower.run()
+        else:
+            results = parse_multi_process(args.folder_path, dbname,
+                                          options, args.manifest_path)
+            report = MetricsReport(results)
+            print(report.format_table())
+            if args.metrics_json:
+                report.save_json(args.metrics_json)
+            if args.metrics_textfile:
+                report.save_textfile(args.metrics_textfile)
+        if profile_dir:
+            print_profile(profile_dir, args.profile_output)
+    finally:
+        # a failed or interrupted run must not leave the collection without its indexes
+        if args.bulk_load and use_mongo:
+            connect_database(dbname)
+            _logger.info("Building LogData indexes")
+            create_indexes()
     end = time.time()
     print(f"\n{'#'*20}\nTotal time taken : {end - start} secs\n{'#'*20}\n")
 
@@ -0,0 +1,43 @@
+from mongoengine import connect, disconnect, get_db
+
+_connection_settings = None
+
+
+def parse_write_concern(value: str):
+    """Turn a ``--write-concern`` value such as ``0``, ``1`` or ``majority`` into pymongo's ``w``."""
+    if value is None:
+        return None
+    return int(value) if value.isdigit() else value
+
+
+def connect_database(db_name: str, pool_size: int = 10, write_concern: str = None):
+    """Open the connection pool of this process, or reuse it if already open.
+
+    Workers call this once from the pool initializer; later calls with the
+    same settings are no-ops so every file parsed by the process shares the
+    same pool.
+    """
+    global _connection_settings
+    settings = (db_name, pool_size, write_concern)
+    if _connection_settings == settings:
+        return
+    if _connection_settings is not None:
+        disconnect()
+    kwargs = {'maxPoolSize': pool_size}
+    w = parse_write_concern(write_concern)
+    if w is not None:
+        kwargs['w'] = w
+    connect(db_name, **kwargs)
+    _connection_settings = settings
+
+
+def disconnect_database():
+    global _connection_settings
+    disconnect()
+    _connection_settings = None
+
+
+def drop_database(db_name: str):
+    connect_database(db_name)
+    get_db().client.drop_database(db_name)
+    disconnect_database()
@@ -19,7 +19,28 @@ class FileVersionData(Document):
     file_path = StringField(max_length=256)
     date_parsed = DateTimeField()
     file_hash = StringField(max_length=100)
+    file_size = LongField()
+    file_mtime = FloatField()
+    quick_hash = StringField(max_length=100)
     is_parsing_complete = BooleanField()
+    # file_hash is the md5 of these first bytes_parsed bytes
+    bytes_parsed = LongField()
+    lines_parsed = LongField()
+    # the rows of the write batches up to this one cover the first
+    # bytes_parsed bytes; later batches of an interrupted parse are purged
+    last_batch_id = IntField()
+    # a file parsed in chunks stores the md5 of every chunk, as {'end': offset, 'md5': digest},
+    # and file_hash is then derived from them; empty once a single parser hashed the whole prefix
+    chunk_hashes = ListField(DictField())
+
+    meta = {
+        'indexes': [
+            ('file_path', 'user_name', 'is_parsing_complete', 'bytes_parsed'),
+            ('file_name', 'file_hash', 'user_name', 'is_parsing_complete'),
+            ('file_name', 'file_size', 'file_mtime', 'quick_hash',
+             'user_name', 'is_parsing_complete'),
+        ]
+    }
 
 
 class LogData(Document):
@@ -34,8 +55,88 @@ class LogData(Document):
     is_skipped = BooleanField()
     is_error = BooleanField()
     error_text = StringField(max_length=256)
+    batch_id = IntField()
+
+    meta = {
+        # created explicitly by database.indexes so a bulk load can defer them
+        'auto_create_index': False,
+        'indexes': [
+            'file_version_data',
+            ('user_name', 'date_time'),
+            ('database_name', 'date_time'),
+            ('user_name', 'database_name', 'sync_mode', 'date_time'),
+        ]
+    }
 
 
 class UnparsedData(Document):
     file_version_data = ReferenceField(FileVersionData)
     text = StringField(max_length=1024)
+    batch_id = IntField()
+
+    meta = {
+        'indexes': ['file_version_data']
+    }
+
+
+class UnparsedPattern(Document):
+    """Unparsed lines of a file counted per template, with ``--unparsed-mode cluster``.
+
+    See ``log_parser.unparsed_patterns`` for how lines become templates.
+    """
+    file_version_data = ReferenceField(FileVersionData)
+    user_name = StringField(max_length=50)
+    template = StringField(max_length=512)
+    count = LongField()
+    first_timestamp = DateTimeField()
+    last_timestamp = DateTimeField()
+    samples = ListField(StringField(max_length=1024))
+
+    meta = {
+        'indexes': [
+            # the key of the upserts, unique so concurrent chunks cannot insert a template twice
+            {'fields': ['file_version_data', 'template'], 'unique': True},
+            'user_name',
+        ]
+    }
+
+
+class SyncRollup(Document):
+    """LogData row counts per hour, user, database, sync mode and modification type, with ``--rollups``.
+
+    Skipped and error rows leave the fields their lines do not have unset.
+    """
+    hour = DateTimeField()
+    user_name = StringField(max_length=50)
+    database_name = StringField(max_length=50)
+    sync_mode = StringField(max_length=20)
+    modification_type = StringField(max_length=20)
+    total = LongField()
+    skipped = LongField()
+    errors = LongField()
+
+    meta = {
+        'indexes': [
+            {'fields': ['hour', 'user_name', 'database_name', 'sync_mode', 'modification_type'],
+             'unique': True},
+            ('user_name', 'hour'),
+            ('database_name', 'hour'),
+        ]
+    }
+
+
+class LogDataBatch(Document):
+    """LogData rows of one write batch in the compact layout.
+
+    See ``log_parser.records.encode_log_batch`` for the encoding.
+    """
+    file_version_data = ReferenceField(FileVersionData)
+    user_name = StringField(max_length=50)
+    batch_id = IntField()
+    count = IntField()
+    dictionary = DictField()
+    rows = DictField()
+
+    meta = {
+        'indexes': ['file_version_data', 'user_name']
+    }
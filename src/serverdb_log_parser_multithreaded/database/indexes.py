@@ -0,0 +1,27 @@
+from serverdb_log_parser_multithreaded.database.db_schema import FileVersionData, LogData, LogDataBatch, \
+    SyncRollup, UnparsedData, UnparsedPattern
+
+# LogData indexes a bulk load keeps: purges and resumes look rows up by file version
+KEPT_LOG_DATA_INDEXES = ([('_id', 1)], [('file_version_data', 1)])
+
+
+def create_indexes(defer_log_data: bool = False):
+    """Create the declared indexes of every collection; existing ones are left as they are.
+
+    With ``defer_log_data`` only the ``file_version_data`` index of LogData is
+    created, the others are built by a later call once the bulk load is done.
+    """
+    for document_class in (FileVersionData, UnparsedData, UnparsedPattern, SyncRollup, LogDataBatch):
+        document_class.ensure_indexes()
+    if defer_log_data:
+        LogData._get_collection().create_index('file_version_data')
+    else:
+        LogData.ensure_indexes()
+
+
+def drop_log_data_indexes():
+    """Drop the LogData secondary indexes ahead of a bulk load, ``_id`` and ``file_version_data`` stay."""
+    collection = LogData._get_collection()
+    for name, info in collection.index_information().items():
+        if [tuple(key) for key in info['key']] not in KEPT_LOG_DATA_INDEXES:
+            collection.drop_index(name)
@@ -0,0 +1,96 @@
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from serverdb_log_parser_multithreaded.log_parser.records import LOG_BATCH_COLLECTION, LogRecord, encode_log_batch
+from serverdb_log_parser_multithreaded.storage.sink import Sink
+
+
+class WriteBatch(NamedTuple):
+    """Records drained from a WriteBuffer together; their rows are stored with ``batch_id``."""
+    batch_id: int
+    records: Dict[str, List]
+    # called once the batch has been written, see WriteBuffer
+    on_written: Optional[Callable[[], None]] = None
+
+
+class WriteBuffer:
+    """Collects parsed records in memory and writes them to a sink in batches.
+
+    Records are any objects with a ``collection`` name and a ``to_document``
+    method; they are converted only when their batch is written. The buffer
+    is flushed once it holds ``flush_size`` records or when
+    ``flush_interval`` seconds have passed since the previous flush. With
+    ``auto_flush`` disabled the owner checks :meth:`is_due` and hands the
+    batches from :meth:`drain` to :meth:`write` itself, e.g. on another thread.
+    With ``compact_layout`` the LogRecords of a batch are written as one
+    ``log_data_batch`` document per file instead of one document each.
+
+    Batches are numbered from ``batch_id + 1`` on. ``checkpoint`` is called
+    with the id of every batch as it is drained and may return a callable
+    that is run once that batch has been written.
+    """
+
+    def __init__(self, sink: Sink, flush_size: int = 1000, flush_interval: float = 5.0, auto_flush: bool = True,
+                 compact_layout: bool = False, checkpoint: Callable[[int], Optional[Callable[[], None]]] = None):
+        self.sink = sink
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.auto_flush = auto_flush
+        self.compact_layout = compact_layout
+        self.checkpoint = checkpoint
+        # id of the last drained batch
+        self.batch_id = 0
+        # seconds spent in the sink, for the parse metrics
+        self.write_time = 0.0
+        self._pending: Dict[str, List] = {}
+        self._count = 0
+        self._last_flush = time.monotonic()
+
+    def __len__(self):
+        return self._count
+
+    def add(self, record):
+        pending = self._pending.get(record.collection)
+        if pending is None:
+            pending = self._pending[record.collection] = []
+        pending.append(record)
+        self._count += 1
+        if self.auto_flush and self.is_due():
+            self.flush()
+
+    def is_due(self) -> bool:
+        return self._count >= self.flush_size or \
+            time.monotonic() - self._last_flush >= self.flush_interval
+
+    def drain(self) -> WriteBatch:
+        """Take the pending records out of the buffer without writing them."""
+        self.batch_id += 1
+        on_written = self.checkpoint(self.batch_id) if self.checkpoint is not None else None
+        batch = WriteBatch(self.batch_id, self._pending, on_written)
+        self._pending = {}
+        self._count = 0
+        self._last_flush = time.monotonic()
+        return batch
+
+    def write(self, batch: WriteBatch):
+        started = time.perf_counter()
+        try:
+            self._write(batch)
+            if batch.on_written is not None:
+                batch.on_written()
+        finally:
+            self.write_time += time.perf_counter() - started
+
+    def _write(self, batch: WriteBatch):
+        for collection, records in batch.records.items():
+            if self.compact_layout and collection == LogRecord.collection:
+                by_file = {}
+                for record in records:
+                    by_file.setdefault(record.file_version_data, []).append(record)
+                self.sink.write(LOG_BATCH_COLLECTION,
+                                [encode_log_batch(file_records, batch.batch_id) for file_records in by_file.values()])
+            else:
+                self.sink.write(collection, [record.to_document(batch.batch_id) for record in records])
+
+    def flush(self):
+        self.write(self.drain())
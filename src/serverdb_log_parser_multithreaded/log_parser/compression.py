@@ -0,0 +1,69 @@
+import bz2
+import gzip
+import io
+import lzma
+
+from serverdb_log_parser_multithreaded.log_parser.fingerprint import READ_BUFFER_SIZE
+
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.xz', '.zst')
+
+
+def is_compressed(file_path: str) -> bool:
+    return file_path.endswith(COMPRESSED_SUFFIXES)
+
+
+def strip_compressed_suffix(file_name: str) -> str:
+    for suffix in COMPRESSED_SUFFIXES:
+        if file_name.endswith(suffix):
+            return file_name[:-len(suffix)]
+    return file_name
+
+
+class HashingReader(io.RawIOBase):
+    """Passes the reads of a binary file through while feeding every byte to ``md5``.
+
+    Lets the hash of a compressed file be computed from the bytes the
+    decompressor reads anyway, instead of in a second pass over the file.
+    """
+
+    def __init__(self, reader, md5):
+        self._reader = reader
+        self._md5 = md5
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self._reader.readinto(buffer)
+        if count:
+            with memoryview(buffer) as view:
+                self._md5.update(view[:count])
+        return count
+
+    def drain(self):
+        """Hash whatever the decompressor left unread, e.g. padding after the last frame."""
+        for block in iter(lambda: self._reader.read(READ_BUFFER_SIZE), b''):
+            self._md5.update(block)
+
+
+def open_decompressed(reader, file_path: str) -> io.BufferedReader:
+    """Wrap a binary ``reader`` of ``file_path`` in a streaming decompressor chosen by its suffix.
+
+    Closing the returned reader leaves ``reader`` open.
+    """
+    if file_path.endswith('.gz'):
+        decompressor = gzip.GzipFile(fileobj=reader, mode='rb')
+    elif file_path.endswith('.bz2'):
+        decompressor = bz2.BZ2File(reader, mode='rb')
+    elif file_path.endswith('.xz'):
+        decompressor = lzma.LZMAFile(reader, mode='rb')
+    elif file_path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Parsing .zst files needs zstandard: pip install zstandard")
+        decompressor = zstandard.ZstdDecompressor().stream_reader(
+            reader, read_size=READ_BUFFER_SIZE, closefd=False)
+    else:
+        raise ValueError(f"Not a compressed file: {file_path}")
+    return io.BufferedReader(decompressor, buffer_size=READ_BUFFER_SIZE)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import json
+import os
+from typing import Dict, Tuple
+
+from serverdb_log_parser_multithreaded.database.db_schema import FileVersionData
+
+
+class DedupIndex:
+    """Size and mtime of every completely parsed file, by path and user.
+
+    Loaded once in the parent so unchanged files are dropped before any
+    worker has to open, hash or look them up. When several complete versions
+    of a file exist the newest one, the one with the most bytes parsed, wins.
+    """
+
+    def __init__(self, entries: Dict[Tuple[str, str], Tuple[int, float]] = None):
+        self._entries = entries or {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def from_database() -> DedupIndex:
+        documents = FileVersionData.objects(is_parsing_complete=True) \
+            .only('file_path', 'user_name', 'file_size', 'file_mtime', 'bytes_parsed').as_pymongo()
+        newest = {}
+        for document in documents:
+            if 'file_path' not in document:
+                continue
+            key = (document['file_path'], document.get('user_name'))
+            # compared on the whole tuple so the winner does not depend on the load order
+            version = (document.get('bytes_parsed') or 0, document.get('file_mtime') or 0,
+                       document.get('file_size') or 0)
+            if key not in newest or version > newest[key]:
+                newest[key] = version
+        return DedupIndex({key: (size, mtime) for key, (_, mtime, size) in newest.items()})
+
+    @staticmethod
+    def from_manifest(manifest_path: str) -> DedupIndex:
+        if not os.path.exists(manifest_path):
+            return DedupIndex()
+        with open(manifest_path, 'r') as reader:
+            return DedupIndex({(path, user_name): (size, mtime)
+                               for path, user_name, size, mtime in json.load(reader)})
+
+    def save(self, manifest_path: str):
+        temp_path = manifest_path + '.tmp'
+        with open(temp_path, 'w') as writer:
+            json.dump([[path, user_name, size, mtime]
+                       for (path, user_name), (size, mtime) in sorted(self._entries.items())], writer)
+        os.replace(temp_path, manifest_path)
+
+    def contains(self, file_path: str, user_name: str, size: int, mtime: float) -> bool:
+        return self._entries.get((os.path.abspath(file_path), user_name)) == (size, mtime)
+
+    def add(self, file_path: str, user_name: str, size: int, mtime: float):
+        self._entries[(os.path.abspath(file_path), user_name)] = (size, mtime)
@@ -0,0 +1,43 @@
+import fnmatch
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, List, Tuple
+
+from serverdb_log_parser_multithreaded.log_parser.compression import strip_compressed_suffix
+
+LOG_FILE_PATTERN = 'serverdb_*.log'
+# scanning is bound by directory listing and stat latency (e.g. on NFS), not CPU
+DISCOVERY_THREADS = 16
+
+
+def find_log_files(folder_path: str, max_workers: int = DISCOVERY_THREADS) -> List[Tuple[str, str, os.stat_result]]:
+    """Return ``(file_path, user_name, stat)`` of every ``<folder>/<user>/serverdb_*.log``."""
+    return [log_file for batch in iter_log_files(folder_path, max_workers) for log_file in batch]
+
+
+def iter_log_files(folder_path: str,
+                   max_workers: int = DISCOVERY_THREADS) -> Iterator[List[Tuple[str, str, os.stat_result]]]:
+    """Scan the user folders concurrently and yield their log files as soon as they are found.
+
+    Each batch holds every file found since the previous one, so a consumer
+    that falls behind the scan gets larger batches to order.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with os.scandir(folder_path) as entries:
+            pending = {executor.submit(_scan_user_folder, entry.path, entry.name)
+                       for entry in entries if entry.is_dir()}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield [log_file for future in done for log_file in future.result()]
+
+
+def _scan_user_folder(user_path: str, user_name: str) -> List[Tuple[str, str, os.stat_result]]:
+    # the size and mtime used for dedup come from this one stat per file
+    with os.scandir(user_path) as entries:
+        return [(entry.path, user_name, entry.stat()) for entry in entries
+                if is_log_file(entry.name) and entry.is_file()]
+
+
+def is_log_file(file_name: str) -> bool:
+    """Whether the name is a serverdb log, plain or compressed with a supported suffix."""
+    return fnmatch.fnmatch(strip_compressed_suffix(file_name), LOG_FILE_PATTERN)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+import hashlib
+import os
+from typing import NamedTuple
+
+QUICK_HASH_BLOCK_SIZE = 64 * 1024
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+class FileFingerprint(NamedTuple):
+    """Cheap identity of a file: size, mtime and a hash of its first and last blocks."""
+    size: int
+    mtime: float
+    quick_hash: str
+
+    @staticmethod
+    def of(file_path: str) -> FileFingerprint:
+        stat = os.stat(file_path)
+        md5 = hashlib.md5()
+        with open(file_path, 'rb') as reader:
+            md5.update(reader.read(QUICK_HASH_BLOCK_SIZE))
+            if stat.st_size > QUICK_HASH_BLOCK_SIZE:
+                reader.seek(max(QUICK_HASH_BLOCK_SIZE,
+                                stat.st_size - QUICK_HASH_BLOCK_SIZE))
+                md5.update(reader.read(QUICK_HASH_BLOCK_SIZE))
+        return FileFingerprint(stat.st_size, stat.st_mtime, md5.hexdigest())
+
+
+def hash_file(file_path: str) -> str:
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as reader:
+        for block in iter(lambda: reader.read(READ_BUFFER_SIZE), b''):
+            md5.update(block)
+    return md5.hexdigest()
@@ -0,0 +1,145 @@
+import hashlib
+import io
+import os
+import signal
+import threading
+import time
+from typing import Dict
+
+from serverdb_log_parser_multithreaded.log_parser.compression import is_compressed
+from serverdb_log_parser_multithreaded.log_parser.discovery import find_log_files
+from serverdb_log_parser_multithreaded.log_parser.fingerprint import FileFingerprint, READ_BUFFER_SIZE
+from serverdb_log_parser_multithreaded.log_parser.log_parser import Parser, ParserOptions, ParseTask, \
+    create_file_version_data
+
+
+class FollowedFile:
+    """A log file being tailed, together with its Parser and the hash of the consumed prefix."""
+
+    def __init__(self, file_path: str, user_name: str, db_name: str, options: ParserOptions):
+        self.file_path = file_path
+        self._options = options
+        self._parser = Parser(ParseTask(file_path, user_name, db_name, options, 0))
+        self._reader = open(file_path, 'rb', buffering=READ_BUFFER_SIZE)
+        self._inode = os.fstat(self._reader.fileno()).st_ino
+        self._md5 = hashlib.md5()
+        fingerprint = FileFingerprint.of(file_path)
+        # the same order as Parser.parse_file, so a restart picks up where the last follower stopped
+        self._file_version_data = self._parser.resume_interrupted_file(
+            self._reader, self._md5, fingerprint)
+        if self._file_version_data is None:
+            self._reader.seek(0)
+            self._md5 = hashlib.md5()
+            self._file_version_data = self._parser.resume_appended_file(
+                self._reader, self._md5, fingerprint)
+        if self._file_version_data is None:
+            self._reader.seek(0)
+            self._md5 = hashlib.md5()
+            self._file_version_data = create_file_version_data(
+                file_path, user_name, fingerprint, self._parser.sink)
+        # bytes after the last newline, parsed once the line is complete
+        self._partial_line = b''
+        self._unsaved = False
+        self._last_save = time.monotonic()
+
+    def poll(self) -> bool:
+        """Parse the complete lines appended since the last poll, return whether any data was read."""
+        data = self._reader.read(READ_BUFFER_SIZE)
+        if not data:
+            return False
+        data = self._partial_line + data
+        end = data.rfind(b'\n') + 1
+        self._partial_line = data[end:]
+        for raw_line in io.BytesIO(data[:end]):
+            self._md5.update(raw_line)
+            self._parser.parse_raw_line(raw_line, self._file_version_data)
+            self._unsaved = True
+        return True
+
+    def is_replaced(self) -> bool:
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return True
+        return stat.st_ino != self._inode or stat.st_size < self._reader.tell()
+
+    def save(self, force: bool = False):
+        """Write the pending rows and the consumed offset once the flush interval has passed.
+
+        ``force`` saves even without new rows, so a version resumed on start
+        is marked complete again when nothing was appended.
+        """
+        if not force and (not self._unsaved or
+                          time.monotonic() - self._last_save < self._options.flush_interval):
+            return
+        # the fingerprint of the consumed prefix, it matches the file only once all of it was read
+        consumed = self._reader.tell() - len(self._partial_line)
+        fingerprint = FileFingerprint.of(self.file_path)._replace(size=consumed)
+        self._parser.save_progress(self._file_version_data, self._md5, fingerprint)
+        self._unsaved = False
+        self._last_save = time.monotonic()
+
+    def close(self):
+        try:
+            self.save(force=True)
+        finally:
+            self._reader.close()
+            self._parser.close()
+
+
+class LogFollower:
+    """Keeps ingesting ``<folder>/<user>/serverdb_*.log`` files as they are created and appended to.
+
+    Files are polled every ``poll_interval`` seconds while idle and the
+    folders are rescanned for new files every ``rescan_interval`` seconds.
+    SIGINT and SIGTERM stop the loop after flushing every pending batch.
+    """
+
+    def __init__(self, folder_path: str, db_name: str, options: ParserOptions,
+                 poll_interval: float = 1.0, rescan_interval: float = 10.0):
+        self.folder_path = folder_path
+        self.db_name = db_name
+        self.options = options
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self._files: Dict[str, FollowedFile] = {}
+        self._stop = threading.Event()
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def run(self):
+        handlers = {sig: signal.signal(sig, self.stop)
+                    for sig in (signal.SIGINT, signal.SIGTERM)}
+        next_scan = 0.0
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() >= next_scan:
+                    self._discover()
+                    next_scan = time.monotonic() + self.rescan_interval
+                active = False
+                for file_path, followed in list(self._files.items()):
+                    if followed.poll():
+                        active = True
+                    elif followed.is_replaced():
+                        print(f"File: {file_path} was rotated or truncated")
+                        followed.close()
+                        del self._files[file_path]
+                        next_scan = 0.0
+                        continue
+                    followed.save()
+                if not active:
+                    self._stop.wait(self.poll_interval)
+        finally:
+            for followed in self._files.values():
+                followed.close()
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+
+    def _discover(self):
+        for file_path, user_name, stat in find_log_files(self.folder_path):
+            # compressed files are archived rotations, there is nothing to follow
+            if file_path not in self._files and not is_compressed(file_path):
+                print(f"Following File: {file_path} User: {user_name}")
+                self._files[file_path] = FollowedFile(
+                    file_path, user_name, self.db_name, self.options)
@@ -0,0 +1,58 @@
+import re
+from typing import Match, Optional, Tuple
+
+
+class LineKind:
+    SYNC = 0
+    SKIPPED = 1
+    ERROR = 2
+    IGNORED = 3
+    UNPARSED = 4
+
+
+_SYNC_ENTRY = r"Author\[(?P<author>.*?)\] Mod:'(?P<modification_type>.*?)' Doc ID:(?P<doc_id>.*)"
+_SKIPPED_ENTRY = r"\[Skipped\].(?P<skipped_message>.*?) Doc ID:(?P<skipped_doc_id>.*)"
+_INFO_PREFIX = r"^(?P<syncdatetime>.*?) INFO \[(?P<database_name>.*?)\] \((?P<sync_mode>.*?)\) "
+
+# One pass over the timestamp prefix decides between a sync entry, a skipped
+# entry and an error entry. The skipped entry's message is captured as
+# ``skipped_message``/``skipped_doc_id`` because group names must be unique.
+Sync_log_line_pattern = re.compile(
+    r"^(?P<syncdatetime>.*?) (?:"
+    r"INFO \[(?P<database_name>.*?)\] \((?P<sync_mode>.*?)\) (?:" + _SYNC_ENTRY + "|" + _SKIPPED_ENTRY + ")"
+    r"|ERROR (?P<error_message>.*))"
+)
+
+# The one pass takes the entry that starts first, while the old chain tried
+# the sync, skipped and error patterns one after the other over the whole
+# line. A line holding a later entry of a pattern that was tried earlier,
+# e.g. an ERROR message quoting a sync entry, is matched again with these.
+Sync_log_entry_pattern = re.compile(_INFO_PREFIX + _SYNC_ENTRY)
+Sync_log_skipped_pattern = re.compile(_INFO_PREFIX + _SKIPPED_ENTRY)
+
+Sync_log_entry_to_be_no_parsed = re.compile(
+    "(Starting to sync|Starting at|Sync from Master done|Sync from Master started|Sync into Master|Stopping the Sync|Ending at)"
+)
+
+
+def classify(line: str) -> Tuple[int, Optional[Match]]:
+    """Return the :class:`LineKind` of a log line and the match holding its fields."""
+    if ' INFO [' in line or ' ERROR ' in line:
+        match = Sync_log_line_pattern.match(line)
+        if match is not None:
+            if match.group('author') is not None:
+                return LineKind.SYNC, match
+            if 'Author[' in line:
+                sync_match = Sync_log_entry_pattern.match(line)
+                if sync_match is not None:
+                    return LineKind.SYNC, sync_match
+            if match.group('skipped_message') is not None:
+                return LineKind.SKIPPED, match
+            if ' INFO [' in line:
+                skipped_match = Sync_log_skipped_pattern.match(line)
+                if skipped_match is not None:
+                    return LineKind.SKIPPED, skipped_match
+            return LineKind.ERROR, match
+    if Sync_log_entry_to_be_no_parsed.search(line):
+        return LineKind.IGNORED, None
+    return LineKind.UNPARSED, None
@@ -0,0 +1,31 @@
+import mmap
+import os
+from typing import Iterator, Optional
+
+from serverdb_log_parser_multithreaded.log_parser.fingerprint import READ_BUFFER_SIZE
+
+
+def map_file(reader) -> Optional[mmap.mmap]:
+    """Map a file opened in binary mode read-only, or return None when it is empty."""
+    if os.fstat(reader.fileno()).st_size == 0:
+        return None
+    return mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_mapped_lines(mapping: mmap.mmap, start: int, end: int) -> Iterator[bytes]:
+    """Yield the lines of ``mapping[start:end]``, newline included.
+
+    The lines are read straight from the page cache, so chunk workers that
+    map the same file share its pages instead of each buffering a copy.
+    """
+    mapping.seek(start)
+    readline = mapping.readline
+    while start < end:
+        raw_line = readline()
+        start += len(raw_line)
+        yield raw_line
+
+
+def hash_range(md5, mapping: mmap.mmap, start: int, end: int):
+    for block_start in range(start, end, READ_BUFFER_SIZE):
+        md5.update(mapping[block_start:min(block_start + READ_BUFFER_SIZE, end)])
@@ -1,153 +1,708 @@
-from serverdb_log_parser_multithreaded.rop.result import Result
 import hashlib
 import datetime
 import os
-import re
-import threading
-from pathlib import Path
-from serverdb_log_parser_multithreaded.database.db_schema import FileVersionData, SyncMode, Modification, LogData, UnparsedData
-import multiprocessing as mp
-from mongoengine import *
-from multiprocessing import Queue
-import os
+import time
+from serverdb_log_parser_multithreaded.database.db_schema import FileVersionData, SyncMode, Modification
+from serverdb_log_parser_multithreaded.database.write_buffer import WriteBuffer
+from serverdb_log_parser_multithreaded.log_parser.compression import HashingReader, is_compressed, \
+    open_decompressed, strip_compressed_suffix
+from serverdb_log_parser_multithreaded.log_parser.fingerprint import FileFingerprint, hash_file, READ_BUFFER_SIZE
+from serverdb_log_parser_multithreaded.log_parser.line_classifier import LineKind, classify
+from serverdb_log_parser_multithreaded.log_parser.line_scanner import hash_range, map_file, read_mapped_lines
+from serverdb_log_parser_multithreaded.log_parser.metrics import ParseMetrics
+from serverdb_log_parser_multithreaded.log_parser.records import LogRecord, UnparsedRecord, line_id
+from serverdb_log_parser_multithreaded.log_parser.rollups import ROLLUP_COLLECTION, Rollups
+from serverdb_log_parser_multithreaded.log_parser.timestamp import TimestampDecoder
+from serverdb_log_parser_multithreaded.log_parser.unparsed_patterns import UNPARSED_PATTERN_COLLECTION, \
+    UnparsedPatterns
+from serverdb_log_parser_multithreaded.storage.sink import Sink, create_sink
+from typing import List, Match, NamedTuple, Optional, Tuple
 
-Sync_log_entry_pattern = re.compile(
-    "^(?P<syncdatetime>.*?) INFO \[(?P<database_name>.*?)\] \((?P<sync_mode>.*?)\) Author\[(?P<author>.*?)\] Mod:\'(?P<modification_type>.*?)\' Doc ID:(?P<doc_id>.*)"
-)
-Sync_log_entry_error_pattern = re.compile(
-    "^(?P<syncdatetime>.*?) ERROR (?P<error_message>.*)"
-)
 
-Sync_log_entry_to_be_no_parsed = re.compile(
-    "(Starting to sync|Starting at|Sync from Master done|Sync from Master started|Sync into Master|Stopping the Sync|Ending at)"
-)
+class ParserOptions(NamedTuple):
+    flush_size: int = 1000
+    flush_interval: float = 5.0
+    dedup: str = 'quick'
+    chunk_size: int = 64 * 1024 * 1024
+    chunk_threshold: int = 256 * 1024 * 1024
+    pool_size: int = 10
+    write_concern: Optional[str] = None
+    async_pipeline: bool = False
+    queue_size: int = 4
+    sink: str = 'mongo'
+    output_path: Optional[str] = None
+    compact_layout: bool = False
+    # a mapped file truncated while it is read kills the worker with SIGBUS, so it is opt-in
+    use_mmap: bool = False
+    # time the regex and timestamp stages of every line, not only the writes
+    time_stages: bool = False
+    # folder the workers write their cProfile stats to, when profiling
+    profile_dir: Optional[str] = None
+    # seconds between the checkpoints a parse interrupted by a crash resumes from
+    checkpoint_interval: float = 30.0
+    # 'raw' stores every unparsed line, 'cluster' counts them per template
+    unparsed_mode: str = 'raw'
+    # count the rows per hour, user, database, sync mode and modification type
+    rollups: bool = False
+    # derive the row ids from the user, file name, byte offset and content of each line
+    deterministic_ids: bool = False
 
-Sync_log_entry_pattern_skipped = re.compile(
-    "^(?P<syncdatetime>.*?) INFO \[(?P<database_name>.*?)\] \((?P<sync_mode>.*?)\) \[Skipped\].(?P<error_message>.*?) Doc ID:(?P<doc_id>.*)"
-)
 
+class ParseStatus:
+    PARSED = "parsed"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+    # a hash_only task hashed its chunk without parsing it
+    HASHED = "hashed"
 
-class Parser:
 
-    def __init__(self, queue: Queue):
-        self._data: dict = {str(LogData): [], str(UnparsedData): []}
-        get = queue.get()
-        if get == None:
-            return
-        self.file_path, self.user_name, self.db_name = get
+class ParseTask(NamedTuple):
+    file_path: str
+    user_name: str
+    db_name: str
+    options: ParserOptions
+    size: int
+    # (file_version_id, start, end) when the task covers one chunk of a file
+    chunk: Optional[Tuple[object, int, int]] = None
+    # only hash the chunk, to check a parsed prefix is unchanged before its tail is parsed
+    hash_only: bool = False
+
+
+class ParseResult(NamedTuple):
+    file_path: str
+    user_name: str
+    status: str
+    lines: int = 0
+    bytes_read: int = 0
+    duration: float = 0.0
+    chunk: Optional[Tuple[object, int, int]] = None
+    error: Optional[str] = None
+    worker_id: Optional[int] = None
+    metrics: Optional[ParseMetrics] = None
+    # the rollups and unparsed patterns of a chunk, written by the caller once the file is complete
+    rollups: Optional[Rollups] = None
+    unparsed_patterns: Optional[UnparsedPatterns] = None
+    # the id of the last batch the parser wrote
+    last_batch_id: Optional[int] = None
+    # the md5 of the bytes of a chunk
+    chunk_hash: Optional[str] = None
+
+
+class ChunkedFile(NamedTuple):
+    file_version_data: FileVersionData
+    ranges: List[Tuple[int, int]]
+    # the chunk digests of the prefix parsed before, the ranges continue after it
+    parsed_chunks: List[dict]
+
+
+def split_file(file_path: str, chunk_size: int, start: int = 0) -> List[Tuple[int, int]]:
+    """Split a file from ``start`` into ``(start, end)`` byte ranges that end on a newline.
+
+    A last line without a newline is left out, the writer may not be done with it.
+    """
+    ranges = []
+    with open(file_path, 'rb') as reader:
+        size = last_line_end(reader, os.path.getsize(file_path))
+        while start < size:
+            reader.seek(min(start + chunk_size, size))
+            reader.readline()
+            end = min(reader.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def last_line_end(reader, size: int) -> int:
+    """Return the offset just past the last newline in the first ``size`` bytes, 0 when there is none."""
+    end = size
+    while end > 0:
+        start = max(end - READ_BUFFER_SIZE, 0)
+        reader.seek(start)
+        newline = reader.read(end - start).rfind(b'\n')
+        if newline >= 0:
+            return start + newline + 1
+        end = start
+    return 0
+
+
+def hash_prefix(reader, end: int, *md5s) -> bool:
+    """Hash the bytes from the position of ``reader`` up to ``end`` into every one of ``md5s``.
+
+    Returns False when the file ends before ``end``.
+    """
+    remaining = end - reader.tell()
+    while remaining > 0:
+        block = reader.read(min(READ_BUFFER_SIZE, remaining))
+        if not block:
+            return False
+        for md5 in md5s:
+            md5.update(block)
+        remaining -= len(block)
+    return True
+
+
+def parsed_chunks(file_version_data: FileVersionData) -> List[dict]:
+    """Return the ``{'end', 'md5'}`` digests covering the first ``bytes_parsed`` bytes of a version.
+
+    A version parsed in one piece has a single digest, its ``file_hash``.
+    """
+    if file_version_data.chunk_hashes:
+        return list(file_version_data.chunk_hashes)
+    if file_version_data.bytes_parsed:
+        return [{'end': file_version_data.bytes_parsed, 'md5': file_version_data.file_hash}]
+    return []
+
+
+def chunk_ranges(chunks: List[dict]) -> List[Tuple[int, int]]:
+    """Return the ``(start, end)`` byte range of every digest of :func:`parsed_chunks`."""
+    ends = [chunk['end'] for chunk in chunks]
+    return list(zip([0] + ends[:-1], ends))
+
 
-    def parse(self):
+def combine_chunk_hashes(digests: List[str]) -> str:
+    """Derive the ``file_hash`` of a version from the md5 of each of its chunks.
+
+    A single chunk keeps its own digest, so a file parsed in one chunk has
+    the same hash as when it is parsed in one piece.
+    """
+    if len(digests) == 1:
+        return digests[0]
+    return hashlib.md5(''.join(digests).encode()).hexdigest()
+
+
+def match_prefix(reader, md5, file_version_data: FileVersionData) -> bool:
+    """Hash the first ``bytes_parsed`` bytes into ``md5`` and compare them with the stored digests."""
+    chunks = parsed_chunks(file_version_data)
+    if len(chunks) == 1:
+        return hash_prefix(reader, chunks[0]['end'], md5) and md5.hexdigest() == chunks[0]['md5']
+    for chunk in chunks:
+        chunk_md5 = hashlib.md5()
+        if not hash_prefix(reader, chunk['end'], md5, chunk_md5) or chunk_md5.hexdigest() != chunk['md5']:
+            return False
+    return True
+
+
+def hash_parsable_part(file_path: str) -> str:
+    """Return the md5 a complete parse of the file stores as ``file_hash``, for ``--dedup full``.
+
+    That covers the lines up to the last newline, or the whole of a compressed archive.
+    """
+    if is_compressed(file_path):
+        return hash_file(file_path)
+    md5 = hashlib.md5()
+    with open(file_path, 'rb', buffering=READ_BUFFER_SIZE) as reader:
+        end = last_line_end(reader, os.fstat(reader.fileno()).st_size)
+        reader.seek(0)
+        hash_prefix(reader, end, md5)
+    return md5.hexdigest()
+
+
+def create_file_version_data(file_path: str, user_name: str, fingerprint: FileFingerprint, sink: Sink,
+                             file_hash: str = None) -> FileVersionData:
+    file_version_data = FileVersionData(user_name=user_name,
+                                        file_name=os.path.basename(file_path),
+                                        file_path=str(os.path.abspath(file_path)), date_parsed=datetime.datetime.today(),
+                                        file_hash=file_hash, file_size=fingerprint.size,
+                                        file_mtime=fingerprint.mtime, quick_hash=fingerprint.quick_hash,
+                                        is_parsing_complete=False)
+    sink.save_file_version(file_version_data)
+    return file_version_data
+
+
+def prepare_chunked_file(file_path: str, user_name: str, options: ParserOptions,
+                         sink: Sink) -> Optional[FileVersionData]:
+    """Find or create the FileVersionData shared by all chunks of a file.
+
+    Returns None when quick dedup finds the file already parsed; with full
+    dedup the chunk digests are compared once the chunks are parsed. A
+    version the chunks may continue, one the file grew from or one
+    interrupted after such a resume, is returned with its ``bytes_parsed``
+    set: the caller checks the digests of its prefix with ``hash_only``
+    tasks before splitting the tail. Chunks keep no checkpoints, so any
+    other interrupted version is purged and the file starts over.
+    """
+    fingerprint = FileFingerprint.of(file_path)
+    if options.dedup == 'quick' and sink.find_parsed_file_version(file_path, user_name, fingerprint):
+        return None
+    interrupted = sink.find_interrupted_file_version(file_path, user_name)
+    if interrupted is not None:
+        if interrupted.bytes_parsed and interrupted.bytes_parsed <= fingerprint.size:
+            return interrupted
+        purged = sink.purge_file_version(interrupted.id)
+        print(f"File: {file_path} was interrupted, purged {purged} rows to parse it again")
+    previous = sink.find_appended_file_version(file_path, user_name, fingerprint.size)
+    if previous is not None:
+        return previous
+    return create_file_version_data(file_path, user_name, fingerprint, sink)
+
+
+class Parser:
+
+    def __init__(self, task: ParseTask):
+        self.file_path, self.user_name, self.db_name, self.options, self.size, self.chunk, self.hash_only = task
+        self._sink = create_sink(self.options.sink, self.db_name, self.options.output_path,
+                                 self.options.pool_size, self.options.write_concern)
+        self._buffer = WriteBuffer(
+            self._sink, self.options.flush_size, self.options.flush_interval,
+            compact_layout=self.options.compact_layout, checkpoint=self._checkpoint)
+        self._patterns = UnparsedPatterns() if self.options.unparsed_mode == 'cluster' else None
+        self.rollups = Rollups() if self.options.rollups else None
+        # a compressed rotation shares the ids of the plain file it was made from
+        self._id_prefix = f"{self.user_name}\n{strip_compressed_suffix(os.path.basename(self.file_path))}\n" \
+            .encode() if self.options.deterministic_ids else None
+        self._line_id = None
+        # per-file pool of the repeated field values, so buffered records share one string each
+        self._interned = {}
+        self._timestamps = TimestampDecoder()
+        self.metrics = ParseMetrics()
+        self._compressed = is_compressed(self.file_path)
+        self._lines = 0
+        self._bytes_read = 0
+        self._start_offset = 0
+        self._start_lines = 0
+        self._file_version_data = None
+        self._file_version_id = None
+        self._file_user_name = None
+        # while parse_file reads: the md5 of the lines read so far, except
+        # for the part of a mapped file that is hashed lazily
+        self._md5 = None
+        self._mapping = None
+        self._hashed_to = 0
+        self._chunk_hash = None
+        self._last_checkpoint = time.monotonic()
         self.worker_id = os.getpid()
-        file_hash = hashlib.md5(open(self.file_path, 'rb').read()).hexdigest()
-        connect(self.db_name)
-        entries = FileVersionData.objects(
-            file_name=os.path.basename(self.file_path),
-            file_hash=file_hash,
-            user_name=self.user_name, is_parsing_complete=True)
-        if any(entries):
+
+    def parse(self) -> ParseResult:
+        start = time.perf_counter()
+        try:
+            if self.hash_only:
+                self.hash_chunk()
+                return self._result(ParseStatus.HASHED, start)
+            if self.chunk:
+                self.parse_chunk()
+                return self._result(ParseStatus.PARSED, start)
+            return self.parse_file(start)
+        finally:
+            self.close()
+
+    @property
+    def sink(self) -> Sink:
+        return self._sink
+
+    def close(self):
+        self._sink.close()
+
+    def parse_file(self, start: float) -> ParseResult:
+        fingerprint = FileFingerprint.of(self.file_path)
+        file_hash = hash_parsable_part(self.file_path) if self.options.dedup == 'full' else None
+        if self._sink.find_parsed_file_version(self.file_path, self.user_name, fingerprint, file_hash):
             self.print(f"File:{self.file_path} already parsed. Skipping!!")
-            return
+            return self._result(ParseStatus.SKIPPED, start)
 
-        file_version_data = FileVersionData(user_name=self.user_name,
-                                            file_name=os.path.basename(
-                                                self.file_path),
-                                            file_path=str(os.path.abspath(self.file_path)), date_parsed=datetime.datetime.today(),
-                                            file_hash=file_hash, is_parsing_complete=False)
-        file_version_data.save()
+        md5 = hashlib.md5()
+        with open(self.file_path, 'rb', buffering=READ_BUFFER_SIZE) as reader:
+            file_version_data = self.resume_interrupted_file(reader, md5, fingerprint)
+            # compressed archives are rotated logs, they never grow
+            if file_version_data is None and not self._compressed:
+                reader.seek(0)
+                md5 = hashlib.md5()
+                file_version_data = self.resume_appended_file(reader, md5, fingerprint)
+            if file_version_data is None:
+                reader.seek(0)
+                md5 = hashlib.md5()
+                file_version_data = create_file_version_data(
+                    self.file_path, self.user_name, fingerprint, self._sink, file_hash)
+            try:
+                if self._compressed:
+                    self._parse_compressed(reader, file_version_data, md5)
+                else:
+                    self._parse_stream(reader, file_version_data, md5)
+                self.save_progress(file_version_data, md5, fingerprint)
+                self.print(
+                    f"File: {file_version_data.file_name} User: {self.user_name} Done!")
+            except:
+                self.print(f"Failed to save data for file: {self.file_path}")
+                raise
+        return self._result(ParseStatus.PARSED, start)
+
+    def save_progress(self, file_version_data: FileVersionData, md5, fingerprint: FileFingerprint):
+        """Flush the buffered rows, then record how far the file has been parsed."""
+        self._buffer.flush()
+        self._write_aggregates(self._drain_aggregates())
+        file_version_data.file_hash = md5.hexdigest()
+        file_version_data.chunk_hashes = []
+        file_version_data.file_size = fingerprint.size
+        file_version_data.file_mtime = fingerprint.mtime
+        file_version_data.quick_hash = fingerprint.quick_hash
+        file_version_data.bytes_parsed = self._start_offset + self._bytes_read
+        file_version_data.lines_parsed = self._start_lines + self._lines
+        file_version_data.last_batch_id = self._buffer.batch_id
+        file_version_data.is_parsing_complete = True
+        self._sink.save_file_version(file_version_data)
+
+    def resume_appended_file(self, reader, md5, fingerprint: FileFingerprint) -> Optional[FileVersionData]:
+        """Find the version this file grew from by appending.
+
+        When the stored prefix hash still matches, ``reader`` is left at the
+        end of the already parsed prefix, ``md5`` holds its hash and the
+        previous FileVersionData is returned so only the tail gets parsed.
+        Rows a follower wrote after its last save are purged first.
+        """
+        previous = self._sink.find_appended_file_version(
+            self.file_path, self.user_name, fingerprint.size)
+        if previous is None or not match_prefix(reader, md5, previous):
+            return None
+        self._sink.purge_file_version(previous.id, previous.last_batch_id or 0)
+        self.print(
+            f"File: {self.file_path} grew since it was parsed, resuming at byte {previous.bytes_parsed}")
+        previous.is_parsing_complete = False
+        self._sink.save_file_version(previous)
+        self._resume_at(previous)
+        return previous
+
+    def resume_interrupted_file(self, reader, md5, fingerprint: FileFingerprint) -> Optional[FileVersionData]:
+        """Find the version of this file a killed or crashed worker left incomplete.
+
+        The rows of the batches written after its last checkpoint are purged
+        and, when the checkpointed prefix still matches, ``reader`` and ``md5``
+        are left at the checkpoint like in :meth:`resume_appended_file`. A
+        version that cannot be continued is purged with all its rows and
+        None is returned.
+        """
+        previous = self._sink.find_interrupted_file_version(self.file_path, self.user_name)
+        if previous is None:
+            return None
+        if not self._compressed and previous.bytes_parsed and previous.bytes_parsed <= fingerprint.size \
+                and match_prefix(reader, md5, previous):
+            purged = self._sink.purge_file_version(previous.id, previous.last_batch_id or 0)
+            self.print(f"File: {self.file_path} was interrupted, purged {purged} rows "
+                       f"and resuming at byte {previous.bytes_parsed}")
+            self._resume_at(previous)
+            return previous
+        purged = self._sink.purge_file_version(previous.id)
+        self.print(f"File: {self.file_path} was interrupted, purged {purged} rows to parse it again")
+        return None
+
+    def _resume_at(self, file_version_data: FileVersionData):
+        self._start_offset = file_version_data.bytes_parsed
+        self._start_lines = file_version_data.lines_parsed or 0
+        # batch ids keep increasing across resumes, so a purge never hits committed rows
+        self._buffer.batch_id = file_version_data.last_batch_id or 0
+
+    def _checkpoint(self, batch_id: int):
+        """Called by the buffer as batch ``batch_id`` is drained, returns what to run once it is written.
+
+        When a checkpoint is due that records the progress up to the end of
+        the batch, together with the unparsed patterns and rollups counted
+        so far, so a resume never counts a line twice. ``flush_size`` counted templates
+        make a checkpoint due before ``checkpoint_interval`` has passed.
+        """
+        file_version_data = self._file_version_data
+        if not self._keeps_checkpoints() or file_version_data is None or \
+                (time.monotonic() - self._last_checkpoint < self.options.checkpoint_interval
+                 and not self._patterns_due()):
+            return None
+        self._last_checkpoint = time.monotonic()
+        bytes_parsed = self._start_offset + self._bytes_read
+        lines_parsed = self._start_lines + self._lines
+        file_hash = self._prefix_hash(bytes_parsed)
+        aggregates = self._drain_aggregates()
+
+        def save():
+            self._write_aggregates(aggregates)
+            file_version_data.file_hash = file_hash
+            file_version_data.chunk_hashes = []
+            file_version_data.bytes_parsed = bytes_parsed
+            file_version_data.lines_parsed = lines_parsed
+            file_version_data.last_batch_id = batch_id
+            self._sink.save_file_version(file_version_data)
+        return save
+
+    def _prefix_hash(self, end: int) -> str:
+        if self._mapping is not None:
+            hash_range(self._md5, self._mapping, self._hashed_to, end)
+            self._hashed_to = end
+        return self._md5.copy().hexdigest()
+
+    def _keeps_checkpoints(self) -> bool:
+        # chunks keep none, their file is complete only once every chunk has been parsed
+        return self._md5 is not None and not self.chunk
+
+    def hash_chunk(self):
+        file_version_id, start, end = self.chunk
+        md5 = hashlib.md5()
+        with open(self.file_path, 'rb', buffering=READ_BUFFER_SIZE) as reader:
+            reader.seek(start)
+            hash_prefix(reader, end, md5)
+        self._chunk_hash = md5.hexdigest()
+
+    def parse_chunk(self):
+        file_version_id, start, end = self.chunk
+        # line offsets count from the start of the file
+        self._start_offset = start
+        file_version_data = self._sink.get_file_version(file_version_id) or \
+            FileVersionData(id=file_version_id, user_name=self.user_name,
+                            file_name=os.path.basename(self.file_path),
+                            file_path=str(os.path.abspath(self.file_path)))
+        # the batches of an appended tail follow those of the parsed prefix
+        self._buffer.batch_id = file_version_data.last_batch_id or 0
+        md5 = hashlib.md5()
         try:
-            with open(self.file_path, 'r') as reader:
-                for line in reader:
-                    self.match_sync_entry(line, file_version_data) \
-                        .on_failure(lambda: self.match_sync_skipped_entry(line, file_version_data))\
-                        .on_failure(lambda: self.match_sync_error_entry(line, file_version_data)) \
-                        .on_failure(lambda: self.unparsed_data(line, file_version_data))
-            file_version_data.is_parsing_complete = True
-            file_version_data.save()
+            with open(self.file_path, 'rb', buffering=READ_BUFFER_SIZE) as reader:
+                reader.seek(start)
+                self._parse_stream(reader, file_version_data, md5, length=end - start)
+            self._buffer.flush()
+            self._chunk_hash = md5.hexdigest()
             self.print(
-                f"File: {file_version_data.file_name} User: {self.user_name} Done!")
+                f"File: {file_version_data.file_name} User: {self.user_name} Bytes {start}-{end} Done!")
         except:
-            self.print(f"Failed to save data for file: {self.file_path}")
+            self.print(
+                f"Failed to save data for file: {self.file_path} bytes {start}-{end}")
             raise
 
+    def _result(self, status: str, start: float) -> ParseResult:
+        self.metrics.bytes_read = self._bytes_read
+        self.metrics.write_time = self._buffer.write_time
+        self.metrics.duration = time.perf_counter() - start
+        return ParseResult(self.file_path, self.user_name, status,
+                           lines=self._lines, bytes_read=self._bytes_read,
+                           duration=self.metrics.duration, chunk=self.chunk,
+                           worker_id=self.worker_id, metrics=self.metrics, rollups=self.rollups,
+                           unparsed_patterns=self._patterns, last_batch_id=self._buffer.batch_id,
+                           chunk_hash=self._chunk_hash)
+
+    def _parse_compressed(self, reader, file_version_data: FileVersionData, md5):
+        """Parse the decompressed lines while ``md5`` hashes the compressed bytes."""
+        hashing_reader = HashingReader(reader, md5)
+        with open_decompressed(hashing_reader, self.file_path) as decompressed:
+            self._parse_stream(decompressed, file_version_data)
+        hashing_reader.drain()
+
+    def _parse_stream(self, reader, file_version_data: FileVersionData, md5=None, length: int = None):
+        if self.options.async_pipeline:
+            import asyncio
+            asyncio.run(self._parse_lines_pipelined(
+                reader, file_version_data, md5, length))
+        else:
+            self._parse_lines(reader, file_version_data, md5, length)
+
+    def _parse_lines(self, reader, file_version_data: FileVersionData, md5=None, length: int = None):
+        for raw_line in self._read_lines(reader, md5, length):
+            self.parse_raw_line(raw_line, file_version_data)
+
+    async def _parse_lines_pipelined(self, reader, file_version_data: FileVersionData, md5=None, length: int = None):
+        """Parse on the event loop while a writer thread inserts the previous batches.
+
+        The two stages are joined by a queue of at most ``queue_size`` batches,
+        so parsing waits for the writer instead of buffering without limit.
+        """
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.options.queue_size)
+        self._buffer.auto_flush = False
+
+        async def write_batches():
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    return
+                await loop.run_in_executor(executor, self._buffer.write, batch)
+
+        async def put(batch):
+            # waits for room in the queue, or raises if the writer failed meanwhile
+            put_batch = asyncio.ensure_future(queue.put(batch))
+            await asyncio.wait({put_batch, writer}, return_when=asyncio.FIRST_COMPLETED)
+            if not put_batch.done():
+                put_batch.cancel()
+                writer.result()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            writer = asyncio.ensure_future(write_batches())
+            try:
+                for raw_line in self._read_lines(reader, md5, length):
+                    self.parse_raw_line(raw_line, file_version_data)
+                    if self._buffer.is_due() or self._patterns_due():
+                        await put(self._buffer.drain())
+                await put(self._buffer.drain())
+                await put(None)
+                await writer
+            finally:
+                writer.cancel()
+                self._buffer.auto_flush = True
+
+    def _read_lines(self, reader, md5=None, length: int = None):
+        """Yield the raw lines from the reader's position, through a read-only mapping with ``use_mmap``.
+
+        Parsing checkpoints are kept while ``md5`` hashes the lines. A last
+        line without a newline may still be being written, so it is left for
+        a later resume, except in compressed archives.
+        """
+        mapping = map_file(reader) if self.options.use_mmap and not self._compressed else None
+        self._md5 = md5
+        try:
+            if mapping is None:
+                yield from self._read_stream_lines(reader, md5, length, whole_lines=not self._compressed)
+                return
+            with mapping:
+                start = reader.tell()
+                end = len(mapping) if length is None else min(start + length, len(mapping))
+                end = max(mapping.rfind(b'\n', start, end) + 1, start)
+                if md5 is None:
+                    yield from read_mapped_lines(mapping, start, end)
+                    return
+                # hashed up to each checkpoint and the rest at the end
+                self._mapping, self._hashed_to = mapping, start
+                yield from read_mapped_lines(mapping, start, end)
+                hash_range(md5, mapping, self._hashed_to, end)
+        finally:
+            self._md5 = None
+            self._mapping = None
+
+    @staticmethod
+    def _read_stream_lines(reader, md5=None, length: int = None, whole_lines: bool = False):
+        consumed = 0
+        for raw_line in reader:
+            if whole_lines and not raw_line.endswith(b'\n'):
+                return
+            if md5 is not None:
+                md5.update(raw_line)
+            yield raw_line
+            consumed += len(raw_line)
+            if length is not None and consumed >= length:
+                return
+
+    def parse_raw_line(self, raw_line: bytes, file_version_data: FileVersionData):
+        if file_version_data is not self._file_version_data:
+            # read the fields once instead of through the document on every line
+            self._file_version_data = file_version_data
+            self._file_version_id = file_version_data.id
+            self._file_user_name = file_version_data.user_name
+        if self._id_prefix is not None:
+            self._line_id = line_id(self._id_prefix, self._start_offset + self._bytes_read, raw_line)
+        # counted first, so a batch flushed by this line's record covers the line
+        self._lines += 1
+        self._bytes_read += len(raw_line)
+        self._parse_line(self._decode_line(raw_line), file_version_data)
+
+    def flush(self):
+        self._buffer.flush()
+
     def print(self, message):
         print(f"Worker Id: {self.worker_id} {message}")
 
-    def match_sync_entry(self, line: str, file_version_data: FileVersionData) -> Result:
+    def _parse_line(self, line: str, file_version_data: FileVersionData):
+        if self.options.time_stages:
+            started = time.perf_counter()
+            kind, match = classify(line)
+            self.metrics.regex_time += time.perf_counter() - started
+        else:
+            kind, match = classify(line)
+        if kind == LineKind.SYNC:
+            if not self.match_sync_entry(line, match, file_version_data):
+                self.unparsed_data(line, file_version_data)
+                kind = LineKind.UNPARSED
+        elif kind == LineKind.SKIPPED:
+            self.match_sync_skipped_entry(match, file_version_data)
+        elif kind == LineKind.ERROR:
+            self.match_sync_error_entry(match, file_version_data)
+        elif kind == LineKind.UNPARSED:
+            self.unparsed_data(line, file_version_data)
+        self.metrics.lines[kind] += 1
+
+    def match_sync_entry(self, line: str, match: Match, file_version_data: FileVersionData) -> bool:
+        # only decoding errors turn the line into unparsed data, write errors must fail the task
         try:
-            match = Sync_log_entry_pattern.match(line)
-            if match == None:
-                return Result.fail('log entry not matched!')
-            dbname = match.group('database_name')
-            syncdatetime = datetime.datetime.strptime(
-                match.group('syncdatetime'), "%Y-%m-%d %H:%M:%S.%f")
+            syncdatetime = self._decode_timestamp(match.group('syncdatetime'))
             sync_mode = SyncMode.SYNCFROM if match.group(
                 'sync_mode') == 'SYNC FROM' else SyncMode.SYNCINTO
-            author = match.group('author')
             modification = self._convert_string_to_modification_type(
                 match.group('modification_type'))
-            document_id = match.group('doc_id')
-            is_skipped = False
-            is_error = False
-            log_data = LogData(file_version_data=file_version_data, \
-                               # sync_batch_id=self._batch_data[dbname], \
-                               user_name=file_version_data.user_name, \
-                               date_time=syncdatetime, \
-                               database_name=dbname, \
-                               sync_mode=sync_mode, \
-                               author=author, \
-                               modification_type=modification, \
-                               document_id=document_id, \
-                               is_skipped=is_skipped, \
-                               is_error=is_error)
-            log_data.save()
-            return Result.ok()
         except Exception as e:
             msg = f"Failed to parse line:\n{line}\n\nFile:{file_version_data.file_name}\n\nException:{e}\n\n"
             self.print(msg)
-            return Result.fail(msg)
-
-    def match_sync_skipped_entry(self, line: str, file_version_data: FileVersionData) -> Result:
-        match = Sync_log_entry_pattern_skipped.match(line)
-        if match == None:
-            return Result.fail('log entry for skipped not matched!')
-        syncdatetime = datetime.datetime.strptime(
-            match.group('syncdatetime'), "%Y-%m-%d %H:%M:%S.%f")
-        error_text = match.group('error_message')
+            return False
+        database_name = self._intern(match.group('database_name'))
+        # counted before the row is added, whose batch may take a checkpoint with the rollups
+        if self.rollups is not None:
+            self.rollups.count(syncdatetime, self._file_user_name, database_name, sync_mode, modification)
+        self._buffer.add(LogRecord(self._file_version_id, self._file_user_name, syncdatetime,
+                                   database_name=database_name,
+                                   sync_mode=sync_mode,
+                                   author=self._intern(match.group('author')),
+                                   modification_type=modification,
+                                   document_id=match.group('doc_id'),
+                                   is_skipped=False,
+                                   is_error=False,
+                                   id=self._line_id))
+        return True
+
+    def match_sync_skipped_entry(self, match: Match, file_version_data: FileVersionData):
+        syncdatetime = self._decode_timestamp(match.group('syncdatetime'))
         sync_mode = SyncMode.SYNCFROM if match.group(
             'sync_mode') == 'SYNC FROM' else SyncMode.SYNCINTO
-        log_data = LogData(file_version_data=file_version_data,
-                           user_name=file_version_data.user_name,
-                           date_time=syncdatetime,
-                           sync_mode=sync_mode,
-                           is_skipped=True,
-                           error_text=error_text)
-        log_data.save()
-        return Result.ok()
-
-    def match_sync_error_entry(self, line: str, file_version_data: FileVersionData) -> Result:
-        match = Sync_log_entry_error_pattern.match(line)
-        if match == None:
-            return Result.fail('log entry for error not matched!')
-        syncdatetime = datetime.datetime.strptime(
-            match.group('syncdatetime'), "%Y-%m-%d %H:%M:%S.%f")
-        error_text = match.group('error_message')
-
-        log_data = LogData(file_version_data=file_version_data,
-                           user_name=file_version_data.user_name,
-                           date_time=syncdatetime,
-                           is_error=True,
-                           error_text=error_text)
-        log_data.save()
-        return Result.ok()
-
-    def unparsed_data(self, line: str, file_version_data: FileVersionData) -> Result:
-        match = Sync_log_entry_to_be_no_parsed.findall(line)
-        if any(match):
-            return Result.ok()
-        unparsed_data = UnparsedData(
-            text=line, file_version_data=file_version_data)
-        unparsed_data.save()
-        return Result.ok()
+        if self.rollups is not None:
+            self.rollups.count(syncdatetime, self._file_user_name, sync_mode=sync_mode, is_skipped=True)
+        self._buffer.add(LogRecord(self._file_version_id, self._file_user_name, syncdatetime,
+                                   sync_mode=sync_mode,
+                                   is_skipped=True,
+                                   error_text=match.group('skipped_message'),
+                                   id=self._line_id))
+
+    def match_sync_error_entry(self, match: Match, file_version_data: FileVersionData):
+        syncdatetime = self._decode_timestamp(match.group('syncdatetime'))
+        if self.rollups is not None:
+            self.rollups.count(syncdatetime, self._file_user_name, is_error=True)
+        self._buffer.add(LogRecord(self._file_version_id, self._file_user_name, syncdatetime,
+                                   is_error=True,
+                                   error_text=match.group('error_message'),
+                                   id=self._line_id))
+
+    def unparsed_data(self, line: str, file_version_data: FileVersionData):
+        if self._patterns is None:
+            self._buffer.add(UnparsedRecord(self._file_version_id, line, self._line_id))
+            return
+        self._patterns.add(line)
+        if self._buffer.auto_flush and self._patterns_due():
+            # the patterns are written with the checkpoint of the next batch
+            self._buffer.flush()
+
+    def _patterns_due(self) -> bool:
+        # without checkpoints, in chunks and archives, the patterns are kept until the end
+        return self._patterns is not None and self._keeps_checkpoints() and \
+            len(self._patterns) >= self.options.flush_size
+
+    def _drain_aggregates(self) -> List[Tuple[str, List[Tuple[dict, dict]]]]:
+        """Take the counted unparsed patterns and rollups out as ``(collection, upserts)`` pairs."""
+        aggregates = []
+        if self._patterns:
+            aggregates.append((UNPARSED_PATTERN_COLLECTION,
+                               self._patterns.drain(self._file_version_id, self._file_user_name)))
+        if self.rollups:
+            aggregates.append((ROLLUP_COLLECTION, self.rollups.drain()))
+        return aggregates
+
+    def _write_aggregates(self, aggregates: List[Tuple[str, List[Tuple[dict, dict]]]]):
+        for collection, updates in aggregates:
+            self._sink.upsert(collection, updates)
+
+    def _decode_timestamp(self, value: str) -> datetime.datetime:
+        if not self.options.time_stages:
+            return self._timestamps.decode(value)
+        started = time.perf_counter()
+        try:
+            return self._timestamps.decode(value)
+        finally:
+            self.metrics.timestamp_time += time.perf_counter() - started
+
+    @staticmethod
+    def _decode_line(raw_line: bytes) -> str:
+        if raw_line.endswith(b'\r\n'):
+            raw_line = raw_line[:-2] + b'\n'
+        return raw_line.decode('utf-8', errors='replace')
+
+    def _intern(self, value: str) -> str:
+        return self._interned.setdefault(value, value)
 
     def _convert_string_to_modification_type(self, value: str) -> str:
         if value == 'M':
@@ -0,0 +1,118 @@
+import json
+import os
+from typing import Dict, List
+
+# indexed by LineKind
+LINE_CATEGORIES = ('sync', 'skipped', 'error', 'ignored', 'unparsed')
+TIMED_STAGES = ('regex', 'timestamp', 'write')
+
+
+class ParseMetrics:
+    """Counters collected while parsing one file or chunk.
+
+    Plain attributes only, so the metrics pickle back from the workers with
+    their ParseResult. Times are in seconds; ``duration`` is the wall time of
+    the whole task.
+    """
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.lines = [0] * len(LINE_CATEGORIES)
+        self.regex_time = 0.0
+        self.timestamp_time = 0.0
+        self.write_time = 0.0
+        self.duration = 0.0
+
+    @property
+    def line_count(self) -> int:
+        return sum(self.lines)
+
+    def add(self, other: 'ParseMetrics'):
+        self.bytes_read += other.bytes_read
+        self.lines = [count + other_count for count, other_count in zip(self.lines, other.lines)]
+        self.regex_time += other.regex_time
+        self.timestamp_time += other.timestamp_time
+        self.write_time += other.write_time
+        self.duration += other.duration
+
+    def stage_times(self) -> Dict[str, float]:
+        return dict(zip(TIMED_STAGES, (self.regex_time, self.timestamp_time, self.write_time)))
+
+    def to_dict(self) -> dict:
+        return {'bytes_read': self.bytes_read,
+                'lines': dict(zip(LINE_CATEGORIES, self.lines)),
+                'seconds': dict(self.stage_times(), total=self.duration)}
+
+
+class MetricsReport:
+    """The metrics of a run's ParseResults per file, per worker and in total."""
+
+    def __init__(self, results: List):
+        self.files: Dict[str, ParseMetrics] = {}
+        self.workers: Dict[int, ParseMetrics] = {}
+        self.total = ParseMetrics()
+        self.statuses: Dict[str, int] = {}
+        for result in results:
+            self.statuses[result.status] = self.statuses.get(result.status, 0) + 1
+            if result.metrics is None:
+                continue
+            # the chunks of a file add up to one row
+            label = f"{result.user_name}/{os.path.basename(result.file_path)}"
+            self.files.setdefault(label, ParseMetrics()).add(result.metrics)
+            self.workers.setdefault(result.worker_id, ParseMetrics()).add(result.metrics)
+            self.total.add(result.metrics)
+
+    def format_table(self) -> str:
+        sections = [sorted(self.files.items()),
+                    [(f"worker {worker_id}", metrics) for worker_id, metrics in sorted(self.workers.items())],
+                    [('total', self.total)]]
+        width = max(len(label) for section in sections for label, _ in section)
+        header = f"{'':<{width}} {'lines':>10}" + \
+            ''.join(f" {category:>9}" for category in LINE_CATEGORIES) + \
+            f" {'MB':>9}" + ''.join(f" {stage + ' s':>11}" for stage in TIMED_STAGES) + f" {'total s':>9}"
+        lines = [header]
+        for section in sections:
+            lines.append('-' * len(header))
+            for label, metrics in section:
+                lines.append(f"{label:<{width}} {metrics.line_count:>10}" +
+                             ''.join(f" {count:>9}" for count in metrics.lines) +
+                             f" {metrics.bytes_read / 1024 ** 2:>9.1f}" +
+                             ''.join(f" {seconds:>11.2f}" for seconds in metrics.stage_times().values()) +
+                             f" {metrics.duration:>9.2f}")
+        return '\n'.join(lines)
+
+    def to_dict(self) -> dict:
+        return {'statuses': self.statuses,
+                'total': self.total.to_dict(),
+                'workers': {str(worker_id): metrics.to_dict() for worker_id, metrics in self.workers.items()},
+                'files': {label: metrics.to_dict() for label, metrics in self.files.items()}}
+
+    def save_json(self, report_path: str):
+        self._save(report_path, json.dumps(self.to_dict(), indent=2))
+
+    def save_textfile(self, report_path: str):
+        """Write the totals in the Prometheus text format read by node_exporter's textfile collector."""
+        lines = ['# HELP serverdb_log_parser_files Files and chunks by parse status.',
+                 '# TYPE serverdb_log_parser_files gauge']
+        lines += [f'serverdb_log_parser_files{{status="{status}"}} {count}'
+                  for status, count in sorted(self.statuses.items())]
+        lines += ['# HELP serverdb_log_parser_lines Lines read by category.',
+                  '# TYPE serverdb_log_parser_lines gauge']
+        lines += [f'serverdb_log_parser_lines{{category="{category}"}} {count}'
+                  for category, count in zip(LINE_CATEGORIES, self.total.lines)]
+        lines += ['# HELP serverdb_log_parser_bytes Bytes read.',
+                  '# TYPE serverdb_log_parser_bytes gauge',
+                  f'serverdb_log_parser_bytes {self.total.bytes_read}',
+                  '# HELP serverdb_log_parser_seconds Seconds spent per stage, summed over the workers.',
+                  '# TYPE serverdb_log_parser_seconds gauge']
+        lines += [f'serverdb_log_parser_seconds{{stage="{stage}"}} {seconds:.6f}'
+                  for stage, seconds in dict(self.total.stage_times(), total=self.total.duration).items()]
+        self._save(report_path, '\n'.join(lines) + '\n')
+
+    @staticmethod
+    def _save(report_path: str, text: str):
+        # replaced atomically so a collector never reads a half written report
+        temp_path = report_path + '.tmp'
+        with open(temp_path, 'w') as writer:
+            writer.write(text)
+        os.replace(temp_path, report_path)
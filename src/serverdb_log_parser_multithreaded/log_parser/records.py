@@ -0,0 +1,112 @@
+import datetime
+import hashlib
+from typing import Iterator, List, NamedTuple
+
+from bson import ObjectId
+
+
+class LogRecord(NamedTuple):
+    """A parsed sync, skipped or error line, stored as a ``LogData`` document.
+
+    Records stay plain tuples while buffered; they are turned into documents
+    only when a batch is written, without mongoengine's per-instance
+    validation and change tracking. Unset fields are left out of the
+    document, like ``Document.to_mongo`` does. ``batch_id`` is the id of the
+    write batch the record is stored with, ``id`` becomes the ``_id`` when set.
+    """
+    file_version_data: ObjectId
+    user_name: str
+    date_time: datetime.datetime
+    database_name: str = None
+    sync_mode: str = None
+    author: str = None
+    modification_type: str = None
+    document_id: str = None
+    is_skipped: bool = None
+    is_error: bool = None
+    error_text: str = None
+    id: ObjectId = None
+
+    collection = 'log_data'
+
+    def to_document(self, batch_id: int = None) -> dict:
+        document = {name: value for name, value in zip(self._fields, self) if value is not None}
+        if self.id is not None:
+            document['_id'] = document.pop('id')
+        if batch_id is not None:
+            document['batch_id'] = batch_id
+        return document
+
+
+class UnparsedRecord(NamedTuple):
+    """A line no pattern matched, stored as an ``UnparsedData`` document."""
+    file_version_data: ObjectId
+    text: str
+    id: ObjectId = None
+
+    collection = 'unparsed_data'
+
+    def to_document(self, batch_id: int = None) -> dict:
+        document = {'file_version_data': self.file_version_data, 'text': self.text}
+        if self.id is not None:
+            document['_id'] = self.id
+        if batch_id is not None:
+            document['batch_id'] = batch_id
+        return document
+
+
+def line_id(prefix: bytes, offset: int, raw_line: bytes) -> ObjectId:
+    """Derive the ``_id`` of a line's row from ``prefix``, the line's byte offset and its content.
+
+    The same line parsed again, by a retried worker, another chunk, after
+    the file grew or from a compressed copy of the file, gets the same id,
+    so a second insert is a duplicate.
+    """
+    return ObjectId(hashlib.md5(prefix + offset.to_bytes(8, 'big') + raw_line).digest()[:12])
+
+
+# --compact-layout stores LogRecords as one column-oriented document per
+# batch: the file reference and user name once, and the low-cardinality
+# fields as small codes into a per-batch dictionary
+LOG_BATCH_COLLECTION = 'log_data_batch'
+DICTIONARY_FIELDS = ('database_name', 'sync_mode', 'author', 'modification_type')
+# the rows of a batch document have no ids of their own
+_BATCH_FIELDS = tuple(field for field in LogRecord._fields[2:] if field != 'id')
+
+
+def encode_log_batch(records: List[LogRecord], batch_id: int = None) -> dict:
+    """Encode records of one file into a single ``log_data_batch`` document."""
+    dictionaries = {field: {} for field in DICTIONARY_FIELDS}
+    columns = {field: [] for field in _BATCH_FIELDS}
+    for record in records:
+        for field, value in zip(_BATCH_FIELDS, record[2:]):
+            codes = dictionaries.get(field)
+            if codes is not None and value is not None:
+                value = codes.setdefault(value, len(codes))
+            columns[field].append(value)
+    return {
+        'file_version_data': records[0].file_version_data,
+        'user_name': records[0].user_name,
+        'batch_id': batch_id,
+        'count': len(records),
+        'dictionary': {field: list(codes) for field, codes in dictionaries.items() if codes},
+        # columns that are unset on every row are left out
+        'rows': {field: values for field, values in columns.items()
+                 if any(value is not None for value in values)},
+    }
+
+
+def decode_log_batch(document: dict) -> Iterator[dict]:
+    """Yield the ``log_data`` documents encoded in a ``log_data_batch`` document."""
+    dictionary = document['dictionary']
+    rows = document['rows']
+    for index in range(document['count']):
+        decoded = {'file_version_data': document['file_version_data'],
+                   'user_name': document['user_name']}
+        if document.get('batch_id') is not None:
+            decoded['batch_id'] = document['batch_id']
+        for field, values in rows.items():
+            value = values[index]
+            if value is not None:
+                decoded[field] = dictionary[field][value] if field in dictionary else value
+        yield decoded
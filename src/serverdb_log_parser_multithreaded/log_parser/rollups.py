@@ -0,0 +1,57 @@
+import datetime
+from typing import Dict, List, Tuple
+
+ROLLUP_COLLECTION = 'sync_rollup'
+# the key of a rollup document, the hour being the start of the hour
+ROLLUP_KEY = ('hour', 'user_name', 'database_name', 'sync_mode', 'modification_type')
+
+
+class Rollups:
+    """Counts of the LogData rows parsed per hour, user, database, sync mode and modification type.
+
+    Every key holds ``[total, skipped, errors]``. The counts are plain
+    tuples and lists, so they pickle back from the workers with their
+    ParseResult and are merged with :meth:`add`.
+    """
+
+    def __init__(self):
+        self.counts: Dict[tuple, List[int]] = {}
+        # the hour of the previous row, most rows share it
+        self._hour_start = None
+        self._hour_end = None
+
+    def __len__(self):
+        return len(self.counts)
+
+    def count(self, date_time: datetime.datetime, user_name: str, database_name: str = None,
+              sync_mode: str = None, modification_type: str = None, is_skipped: bool = False,
+              is_error: bool = False):
+        if self._hour_start is None or not self._hour_start <= date_time < self._hour_end:
+            self._hour_start = date_time.replace(minute=0, second=0, microsecond=0)
+            self._hour_end = self._hour_start + datetime.timedelta(hours=1)
+        key = (self._hour_start, user_name, database_name, sync_mode, modification_type)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0, 0, 0]
+        counts[0] += 1
+        if is_skipped:
+            counts[1] += 1
+        if is_error:
+            counts[2] += 1
+
+    def add(self, other: 'Rollups'):
+        for key, (total, skipped, errors) in other.counts.items():
+            counts = self.counts.get(key)
+            if counts is None:
+                self.counts[key] = [total, skipped, errors]
+            else:
+                counts[0] += total
+                counts[1] += skipped
+                counts[2] += errors
+
+    def drain(self) -> List[Tuple[dict, dict]]:
+        """Take the counts out as ``(filter, update)`` upserts adding them to the ``sync_rollup`` documents."""
+        updates = [(dict(zip(ROLLUP_KEY, key)), {'$inc': {'total': total, 'skipped': skipped, 'errors': errors}})
+                   for key, (total, skipped, errors) in self.counts.items()]
+        self.counts = {}
+        return updates
@@ -0,0 +1,36 @@
+import datetime
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+class TimestampDecoder:
+    """Decodes ``%Y-%m-%d %H:%M:%S.%f`` timestamps by slicing fixed positions.
+
+    Consecutive log lines share the date, hour and minute, so the decoded
+    ``YYYY-MM-DD HH:MM`` prefix is kept and only the seconds are parsed for
+    each line. Anything that does not fit the fixed layout goes through
+    ``strptime``, which raises the usual ``ValueError`` for malformed input.
+    """
+
+    def __init__(self):
+        self._prefix = None
+        self._fields = None
+
+    def decode(self, value: str) -> datetime.datetime:
+        try:
+            prefix = value[:16]
+            if prefix != self._prefix:
+                if prefix[4] != '-' or prefix[7] != '-' or prefix[10] != ' ' or prefix[13] != ':' \
+                        or not (prefix[:4] + prefix[5:7] + prefix[8:10] + prefix[11:13] + prefix[14:16]).isdigit():
+                    raise ValueError(value)
+                self._fields = (int(prefix[:4]), int(prefix[5:7]), int(prefix[8:10]),
+                                int(prefix[11:13]), int(prefix[14:16]))
+                self._prefix = prefix
+            second = value[17:19]
+            fraction = value[20:]
+            if value[16] != ':' or value[19] != '.' or not second.isdigit() \
+                    or not 0 < len(fraction) <= 6 or not fraction.isdigit():
+                raise ValueError(value)
+            return datetime.datetime(*self._fields, int(second), int(fraction.ljust(6, '0')))
+        except (ValueError, IndexError):
+            return datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
@@ -0,0 +1,107 @@
+import datetime
+import re
+from typing import Dict, List, Optional, Tuple
+
+from serverdb_log_parser_multithreaded.log_parser.timestamp import TimestampDecoder
+
+UNPARSED_PATTERN_COLLECTION = 'unparsed_pattern'
+# lines kept per template, and the stored length of templates and sample lines
+SAMPLE_COUNT = 3
+TEMPLATE_LENGTH = 512
+SAMPLE_LENGTH = 1024
+
+# masked in this order, so timestamps and ids are not cut into numbers first
+TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?")
+IDENTIFIER = re.compile(r"\b[0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}\b"
+                        r"|\b0x[0-9a-fA-F]+\b"
+                        r"|\b(?=[0-9a-fA-F]*[0-9])(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b")
+NUMBER = re.compile(r"\d+")
+
+
+def to_template(text: str) -> str:
+    """Mask the timestamps, ids and numbers of a line, e.g. ``<TS> WARN Retrying in <NUM> seconds``."""
+    text = TIMESTAMP.sub('<TS>', text)
+    text = IDENTIFIER.sub('<ID>', text)
+    return NUMBER.sub('<NUM>', text)[:TEMPLATE_LENGTH]
+
+
+class _Pattern:
+    __slots__ = ('count', 'first_timestamp', 'last_timestamp', 'samples')
+
+    def __init__(self, timestamp: Optional[datetime.datetime], sample: str):
+        self.count = 1
+        self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        self.samples = [sample]
+
+
+class UnparsedPatterns:
+    """Counts the unparsed lines of a file per template instead of keeping every line.
+
+    Per template the number of lines, the first and last timestamp a line
+    starts with and the first ``SAMPLE_COUNT`` lines are kept until
+    :meth:`drain` turns them into upserts adding to the stored counts, so
+    the patterns of several drains, chunks or runs end up in one document.
+    The patterns of the chunks of a file are merged with :meth:`add_patterns`.
+    """
+
+    def __init__(self):
+        self._timestamps = TimestampDecoder()
+        self._patterns: Dict[str, _Pattern] = {}
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def add(self, line: str):
+        text = line.rstrip('\r\n')
+        timestamp = self._timestamp(text)
+        template = to_template(text)
+        pattern = self._patterns.get(template)
+        if pattern is None:
+            self._patterns[template] = _Pattern(timestamp, text[:SAMPLE_LENGTH])
+            return
+        pattern.count += 1
+        if timestamp is not None:
+            if pattern.first_timestamp is None or timestamp < pattern.first_timestamp:
+                pattern.first_timestamp = timestamp
+            if pattern.last_timestamp is None or timestamp > pattern.last_timestamp:
+                pattern.last_timestamp = timestamp
+        if len(pattern.samples) < SAMPLE_COUNT:
+            pattern.samples.append(text[:SAMPLE_LENGTH])
+
+    def add_patterns(self, other: 'UnparsedPatterns'):
+        for template, added in other._patterns.items():
+            pattern = self._patterns.get(template)
+            if pattern is None:
+                self._patterns[template] = added
+                continue
+            pattern.count += added.count
+            if added.first_timestamp is not None:
+                if pattern.first_timestamp is None or added.first_timestamp < pattern.first_timestamp:
+                    pattern.first_timestamp = added.first_timestamp
+                if pattern.last_timestamp is None or added.last_timestamp > pattern.last_timestamp:
+                    pattern.last_timestamp = added.last_timestamp
+            pattern.samples = (pattern.samples + added.samples)[:SAMPLE_COUNT]
+
+    def drain(self, file_version_id, user_name: str) -> List[Tuple[dict, dict]]:
+        """Take the counted patterns out as ``(filter, update)`` upserts of ``unparsed_pattern`` documents."""
+        updates = []
+        for template, pattern in self._patterns.items():
+            update = {'$setOnInsert': {'user_name': user_name},
+                      '$inc': {'count': pattern.count},
+                      '$push': {'samples': {'$each': pattern.samples, '$slice': SAMPLE_COUNT}}}
+            if pattern.first_timestamp is not None:
+                update['$min'] = {'first_timestamp': pattern.first_timestamp}
+                update['$max'] = {'last_timestamp': pattern.last_timestamp}
+            updates.append(({'file_version_data': file_version_id, 'template': template}, update))
+        self._patterns = {}
+        return updates
+
+    def _timestamp(self, text: str) -> Optional[datetime.datetime]:
+        match = TIMESTAMP.match(text)
+        if match is None:
+            return None
+        try:
+            return self._timestamps.decode(match.group())
+        except ValueError:
+            return None
@@ -0,0 +1,94 @@
+import gzip
+import os
+import uuid
+from typing import Dict, List
+
+from bson import json_util
+
+from serverdb_log_parser_multithreaded.storage.schema import ColumnType, collection_columns, column_value
+from serverdb_log_parser_multithreaded.storage.sink import LocalSink
+
+
+class JsonlSink(LocalSink):
+    """Appends each collection as gzip-compressed MongoDB extended JSON lines.
+
+    Every sink writes its own ``<collection>-<pid>-<id>.jsonl.gz`` files in the
+    output directory; they can be loaded later with ``mongoimport``.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._writers: Dict[str, gzip.GzipFile] = {}
+        self._file_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def write(self, collection: str, documents: List[dict]):
+        if not documents:
+            return
+        writer = self._writers.get(collection)
+        if writer is None:
+            writer = gzip.open(os.path.join(
+                self.directory, f"{collection}-{self._file_id}.jsonl.gz"), 'wt', encoding='utf-8')
+            self._writers[collection] = writer
+        writer.write(''.join(json_util.dumps(document) + '\n' for document in documents))
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers = {}
+
+
+class ParquetSink(LocalSink):
+    """Writes each collection to Parquet files, one row group per batch.
+
+    Needs the optional ``pyarrow`` package.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__()
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("The parquet sink needs pyarrow: pip install pyarrow")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._writers = {}
+
+    def _schema(self, collection: str):
+        types = {
+            ColumnType.STRING: self._pa.string(),
+            ColumnType.DATETIME: self._pa.timestamp('us'),
+            ColumnType.BOOLEAN: self._pa.bool_(),
+            ColumnType.INTEGER: self._pa.int64(),
+            ColumnType.FLOAT: self._pa.float64(),
+        }
+        return self._pa.schema([(name, types[column_type])
+                                for name, column_type in collection_columns(collection)])
+
+    def write(self, collection: str, documents: List[dict]):
+        if not documents:
+            return
+        writer = self._writers.get(collection)
+        if writer is None:
+            file_name = f"{collection}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet"
+            writer = self._pq.ParquetWriter(os.path.join(self.directory, file_name),
+                                            self._schema(collection), compression='zstd')
+            self._writers[collection] = writer
+        names = writer.schema.names
+        rows = [{name: column_value(document.get(name)) for name in names} for document in documents]
+        writer.write_table(self._pa.Table.from_pylist(rows, schema=writer.schema))
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers = {}
@@ -0,0 +1,85 @@
+import os
+from typing import List, Optional, Tuple
+
+from mongoengine import get_db
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from serverdb_log_parser_multithreaded.database.connection import connect_database
+from serverdb_log_parser_multithreaded.database.db_schema import FileVersionData, LogData, LogDataBatch, \
+    UnparsedData, UnparsedPattern
+from serverdb_log_parser_multithreaded.log_parser.fingerprint import FileFingerprint
+from serverdb_log_parser_multithreaded.storage.sink import Sink
+
+
+DUPLICATE_KEY = 11000
+
+
+class MongoSink(Sink):
+    """Writes to MongoDB through the connection pool of the current process."""
+
+    def __init__(self, db_name: str, pool_size: int = 10, write_concern: str = None):
+        connect_database(db_name, pool_size, write_concern)
+
+    def write(self, collection: str, documents: List[dict]):
+        if not documents:
+            return
+        try:
+            get_db()[collection].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # rows with deterministic ids that are stored already are skipped
+            if e.details.get('writeConcernErrors') or \
+                    any(error['code'] != DUPLICATE_KEY for error in e.details['writeErrors']):
+                raise
+
+    def upsert(self, collection: str, updates: List[Tuple[dict, dict]]):
+        if updates:
+            get_db()[collection].bulk_write(
+                [UpdateOne(query, update, upsert=True) for query, update in updates], ordered=False)
+
+    def save_file_version(self, file_version_data: FileVersionData):
+        file_version_data.save()
+
+    def get_file_version(self, file_version_id) -> Optional[FileVersionData]:
+        return FileVersionData.objects(id=file_version_id).first()
+
+    def find_parsed_file_version(self, file_path: str, user_name: str,
+                                 fingerprint: FileFingerprint, file_hash: str = None) -> bool:
+        if file_hash:
+            entries = FileVersionData.objects(
+                file_name=os.path.basename(file_path),
+                file_hash=file_hash,
+                user_name=user_name, is_parsing_complete=True)
+        else:
+            entries = FileVersionData.objects(
+                file_name=os.path.basename(file_path),
+                file_size=fingerprint.size,
+                file_mtime=fingerprint.mtime,
+                quick_hash=fingerprint.quick_hash,
+                user_name=user_name, is_parsing_complete=True)
+        return entries.only('id').first() is not None
+
+    def find_appended_file_version(self, file_path: str, user_name: str, size: int) -> Optional[FileVersionData]:
+        """Return the latest completed version of a file that is not longer than it is now."""
+        return FileVersionData.objects(
+            file_path=str(os.path.abspath(file_path)),
+            user_name=user_name, is_parsing_complete=True,
+            bytes_parsed__gt=0, bytes_parsed__lte=size, file_hash__ne=None) \
+            .order_by('-bytes_parsed').first()
+
+    def find_interrupted_file_version(self, file_path: str, user_name: str) -> Optional[FileVersionData]:
+        """Return the latest version of a file whose parse never completed."""
+        return FileVersionData.objects(
+            file_path=str(os.path.abspath(file_path)),
+            user_name=user_name, is_parsing_complete=False).order_by('-id').first()
+
+    def purge_file_version(self, file_version_id, after_batch_id: int = None) -> int:
+        rows = {'file_version_data': file_version_id}
+        if after_batch_id is not None:
+            rows['batch_id'] = {'$gt': after_batch_id}
+        db = get_db()
+        purged = sum(db[document_class._get_collection_name()].delete_many(rows).deleted_count
+                     for document_class in (LogData, UnparsedData, UnparsedPattern, LogDataBatch))
+        if after_batch_id is None:
+            FileVersionData.objects(id=file_version_id).delete()
+        return purged
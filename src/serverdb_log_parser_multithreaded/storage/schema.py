@@ -0,0 +1,48 @@
+from typing import List, Tuple
+
+from bson import ObjectId, json_util
+from mongoengine import BooleanField, DateTimeField, FloatField, IntField, LongField
+
+from serverdb_log_parser_multithreaded.database.db_schema import FileVersionData, LogData, LogDataBatch, \
+    SyncRollup, UnparsedData, UnparsedPattern
+
+# documents the column-oriented sinks know how to lay out as tables
+DOCUMENT_CLASSES = (FileVersionData, LogData, UnparsedData, UnparsedPattern, SyncRollup, LogDataBatch)
+
+
+class ColumnType:
+    STRING = "string"
+    DATETIME = "datetime"
+    BOOLEAN = "boolean"
+    INTEGER = "integer"
+    FLOAT = "float"
+
+
+def _column_type(field) -> str:
+    if isinstance(field, DateTimeField):
+        return ColumnType.DATETIME
+    if isinstance(field, BooleanField):
+        return ColumnType.BOOLEAN
+    if isinstance(field, (IntField, LongField)):
+        return ColumnType.INTEGER
+    if isinstance(field, FloatField):
+        return ColumnType.FLOAT
+    # strings, ObjectIds, references, embedded dicts and lists are all stored as text
+    return ColumnType.STRING
+
+
+def collection_columns(collection: str) -> List[Tuple[str, str]]:
+    """Return ``(column, ColumnType)`` for every field stored in a collection."""
+    for document_class in DOCUMENT_CLASSES:
+        if document_class._get_collection_name() == collection:
+            return [(field.db_field, _column_type(field))
+                    for field in document_class._fields.values()]
+    raise KeyError(f"No table layout for collection {collection}")
+
+
+def column_value(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (dict, list)):
+        return json_util.dumps(value)
+    return value
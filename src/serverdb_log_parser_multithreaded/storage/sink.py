@@ -0,0 +1,131 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from serverdb_log_parser_multithreaded.log_parser.fingerprint import FileFingerprint
+
+if TYPE_CHECKING:
+    # imported where used, so the CLI can list SINK_TYPES without loading mongoengine
+    from bson import ObjectId
+    from serverdb_log_parser_multithreaded.database.db_schema import FileVersionData
+
+SINK_TYPES = ('mongo', 'sqlite', 'jsonl', 'parquet')
+
+
+class Sink:
+    """Storage the Parser writes its rows and FileVersionData bookkeeping to.
+
+    ``write`` receives the BSON-ready documents of one batch for one
+    collection. The lookups used for dedup and resuming return nothing and
+    purging deletes nothing by default, so sinks without them always parse
+    files from the start.
+    """
+
+    def write(self, collection: str, documents: List[dict]):
+        raise NotImplementedError
+
+    def upsert(self, collection: str, updates: List[Tuple[dict, dict]]):
+        """Apply ``(filter, update)`` pairs in MongoDB update syntax, inserting documents no filter matches."""
+        raise NotImplementedError
+
+    def save_file_version(self, file_version_data: FileVersionData):
+        raise NotImplementedError
+
+    def get_file_version(self, file_version_id) -> Optional[FileVersionData]:
+        return None
+
+    def find_parsed_file_version(self, file_path: str, user_name: str,
+                                 fingerprint: FileFingerprint, file_hash: str = None) -> bool:
+        return False
+
+    def find_appended_file_version(self, file_path: str, user_name: str, size: int) -> Optional[FileVersionData]:
+        return None
+
+    def find_interrupted_file_version(self, file_path: str, user_name: str) -> Optional[FileVersionData]:
+        return None
+
+    def purge_file_version(self, file_version_id, after_batch_id: int = None) -> int:
+        """Delete the rows a version's batches after ``after_batch_id`` wrote, return how many.
+
+        Without ``after_batch_id`` all its rows and the FileVersionData itself are deleted.
+        """
+        return 0
+
+    def close(self):
+        pass
+
+
+class LocalSink(Sink):
+    """Base of the sinks writing to local files.
+
+    FileVersionData documents get their ids assigned locally and are written
+    to the ``file_version_data`` collection with their final state on close.
+    """
+
+    def __init__(self):
+        self._file_versions: Dict[ObjectId, FileVersionData] = {}
+
+    def upsert(self, collection: str, updates: List[Tuple[dict, dict]]):
+        # local files are not updated in place: every update is appended as a
+        # row of its own and the rows of one filter are added up when read
+        self.write(collection, [_flatten_update(query, update) for query, update in updates])
+
+    def save_file_version(self, file_version_data: FileVersionData):
+        from bson import ObjectId
+        if file_version_data.id is None:
+            file_version_data.id = ObjectId()
+        self._file_versions[file_version_data.id] = file_version_data
+
+    def close(self):
+        if self._file_versions:
+            from serverdb_log_parser_multithreaded.database.db_schema import FileVersionData
+            self.write(FileVersionData._get_collection_name(),
+                       [file_version_data.to_mongo() for file_version_data in self._file_versions.values()])
+            self._file_versions = {}
+
+
+def _flatten_update(query: dict, update: dict) -> dict:
+    document = dict(query)
+    for fields in update.values():
+        for name, value in fields.items():
+            # {'$push': {name: {'$each': values, ...}}}
+            document[name] = value['$each'] if isinstance(value, dict) and '$each' in value else value
+    return document
+
+
+class MemorySink(LocalSink):
+    """Keeps the written documents in memory, or only counts them with ``keep_documents`` disabled.
+
+    Used to measure the parser without any storage cost.
+    """
+
+    def __init__(self, keep_documents: bool = True):
+        super().__init__()
+        self.keep_documents = keep_documents
+        self.documents: Dict[str, List[dict]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def write(self, collection: str, documents: List[dict]):
+        self.counts[collection] = self.counts.get(collection, 0) + len(documents)
+        if self.keep_documents:
+            self.documents.setdefault(collection, []).extend(documents)
+
+
+def create_sink(sink_type: str, db_name: str, output_path: str = None,
+                pool_size: int = 10, write_concern: str = None) -> Sink:
+    if sink_type == 'mongo':
+        from serverdb_log_parser_multithreaded.storage.mongo_sink import MongoSink
+        return MongoSink(db_name, pool_size, write_concern)
+    if sink_type == 'memory':
+        return MemorySink(keep_documents=False)
+    if output_path is None:
+        raise ValueError(f"The {sink_type} sink needs an output path")
+    if sink_type == 'sqlite':
+        from serverdb_log_parser_multithreaded.storage.sqlite_sink import SQLiteSink
+        return SQLiteSink(output_path)
+    if sink_type == 'jsonl':
+        from serverdb_log_parser_multithreaded.storage.file_sinks import JsonlSink
+        return JsonlSink(output_path)
+    if sink_type == 'parquet':
+        from serverdb_log_parser_multithreaded.storage.file_sinks import ParquetSink
+        return ParquetSink(output_path)
+    raise ValueError(f"Unknown sink: {sink_type}")
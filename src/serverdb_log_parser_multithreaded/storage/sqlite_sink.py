@@ -0,0 +1,62 @@
+import datetime
+import sqlite3
+from typing import List
+
+from serverdb_log_parser_multithreaded.storage.schema import ColumnType, collection_columns, column_value
+from serverdb_log_parser_multithreaded.storage.sink import LocalSink
+
+SQLITE_TYPES = {
+    ColumnType.STRING: "TEXT",
+    ColumnType.DATETIME: "TEXT",
+    ColumnType.BOOLEAN: "INTEGER",
+    ColumnType.INTEGER: "INTEGER",
+    ColumnType.FLOAT: "REAL",
+}
+
+
+def _sqlite_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    return column_value(value)
+
+
+class SQLiteSink(LocalSink):
+    """Writes every collection to a table of one SQLite file, one transaction per batch.
+
+    ``_id`` is unique, rows whose id is stored already are skipped.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        # workers share the file, so wait for the write lock instead of failing
+        # the async pipeline writes from its writer thread, never concurrently with the parser
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._tables = set()
+
+    def write(self, collection: str, documents: List[dict]):
+        if not documents:
+            return
+        names = [name for name, _ in collection_columns(collection)]
+        columns = ", ".join(f'"{name}"' for name in names)
+        placeholders = ", ".join("?" * len(names))
+        with self._connection:
+            if collection not in self._tables:
+                self._create_table(collection)
+            self._connection.executemany(
+                f'INSERT OR IGNORE INTO "{collection}" ({columns}) VALUES ({placeholders})',
+                [[_sqlite_value(document.get(name)) for name in names] for document in documents])
+
+    def _create_table(self, collection: str):
+        # rows without an id leave it NULL, which never conflicts
+        columns = ", ".join(f'"{name}" {SQLITE_TYPES[column_type]}' + (' UNIQUE' if name == '_id' else '')
+                            for name, column_type in collection_columns(collection))
+        self._connection.execute(f'CREATE TABLE IF NOT EXISTS "{collection}" ({columns})')
+        self._tables.add(collection)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._connection.close()
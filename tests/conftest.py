@@ -0,0 +1,154 @@
+import datetime
+import os
+from typing import Dict, List
+
+import pytest
+from bson import ObjectId
+
+from serverdb_log_parser_multithreaded.database.db_schema import FileVersionData
+from serverdb_log_parser_multithreaded.log_parser import log_parser
+from serverdb_log_parser_multithreaded.storage import sink as sink_module
+from serverdb_log_parser_multithreaded.storage.sink import Sink
+
+
+class Store:
+    """Collections shared by every sink of a test, like one MongoDB database."""
+
+    def __init__(self):
+        self.collections: Dict[str, List[dict]] = {}
+        self.file_versions: Dict[ObjectId, dict] = {}
+        # fails the write with this 1-based number, to simulate a crash
+        self.fail_write = None
+        self.writes = 0
+
+    def rows(self, collection: str) -> List[dict]:
+        return self.collections.get(collection, [])
+
+    def versions(self) -> List[FileVersionData]:
+        return [FileVersionData._from_son(son) for son in self.file_versions.values()]
+
+
+class Crash(BaseException):
+    """Raised by a failing write; not an Exception, so nothing on the way swallows it."""
+
+
+class StoreSink(Sink):
+    """In-memory sink with the lookups and purges of MongoSink."""
+
+    def __init__(self, store: Store):
+        self.store = store
+
+    def write(self, collection: str, documents: List[dict]):
+        self.store.writes += 1
+        if self.store.writes == self.store.fail_write:
+            raise Crash()
+        stored = self.store.collections.setdefault(collection, [])
+        ids = {document['_id'] for document in stored if '_id' in document}
+        stored.extend(document for document in documents if '_id' not in document or document['_id'] not in ids)
+
+    def upsert(self, collection: str, updates):
+        stored = self.store.collections.setdefault(collection, [])
+        for query, update in updates:
+            document = next((document for document in stored
+                             if all(document.get(name) == value for name, value in query.items())), None)
+            if document is None:
+                document = dict(query)
+                document.update(update.get('$setOnInsert', {}))
+                stored.append(document)
+            for name, value in update.get('$inc', {}).items():
+                document[name] = document.get(name, 0) + value
+            for name, value in update.get('$min', {}).items():
+                document[name] = value if document.get(name) is None else min(document[name], value)
+            for name, value in update.get('$max', {}).items():
+                document[name] = value if document.get(name) is None else max(document[name], value)
+            for name, value in update.get('$push', {}).items():
+                document[name] = (document.get(name, []) + value['$each'])[:value['$slice']]
+
+    def save_file_version(self, file_version_data: FileVersionData):
+        if file_version_data.id is None:
+            file_version_data.id = ObjectId()
+        self.store.file_versions[file_version_data.id] = file_version_data.to_mongo().to_dict()
+
+    def get_file_version(self, file_version_id):
+        son = self.store.file_versions.get(file_version_id)
+        return None if son is None else FileVersionData._from_son(son)
+
+    def find_parsed_file_version(self, file_path, user_name, fingerprint, file_hash=None) -> bool:
+        for version in self.store.versions():
+            if version.file_name != os.path.basename(file_path) or version.user_name != user_name \
+                    or not version.is_parsing_complete:
+                continue
+            if file_hash and version.file_hash == file_hash:
+                return True
+            if not file_hash and (version.file_size, version.file_mtime, version.quick_hash) == fingerprint:
+                return True
+        return False
+
+    def find_appended_file_version(self, file_path, user_name, size):
+        versions = [version for version in self.store.versions()
+                    if version.file_path == os.path.abspath(file_path) and version.user_name == user_name
+                    and version.is_parsing_complete and version.bytes_parsed
+                    and version.bytes_parsed <= size and version.file_hash]
+        return max(versions, key=lambda version: version.bytes_parsed, default=None)
+
+    def find_interrupted_file_version(self, file_path, user_name):
+        versions = [version for version in self.store.versions()
+                    if version.file_path == os.path.abspath(file_path) and version.user_name == user_name
+                    and not version.is_parsing_complete]
+        return max(versions, key=lambda version: version.id, default=None)
+
+    def purge_file_version(self, file_version_id, after_batch_id=None) -> int:
+        purged = 0
+        for collection, documents in self.store.collections.items():
+            kept = [document for document in documents
+                    if document.get('file_version_data') != file_version_id
+                    or (after_batch_id is not None and not document.get('batch_id', 0) > after_batch_id)]
+            purged += len(documents) - len(kept)
+            documents[:] = kept
+        if after_batch_id is None:
+            self.store.file_versions.pop(file_version_id, None)
+        return purged
+
+
+@pytest.fixture
+def store(monkeypatch) -> Store:
+    """Make every sink created by the parser, the planner and the follower write to one Store."""
+    store = Store()
+
+    def create_sink(*args, **kwargs):
+        return StoreSink(store)
+    monkeypatch.setattr(log_parser, 'create_sink', create_sink)
+    monkeypatch.setattr(sink_module, 'create_sink', create_sink)
+    return store
+
+
+def sync_line(index: int, database: str = 'Hull_A') -> str:
+    timestamp = datetime.datetime(2019, 3, 12, 8, 0) + datetime.timedelta(seconds=index)
+    return f"{timestamp:%Y-%m-%d %H:%M:%S}.{index % 1000:03d} INFO [{database}] (SYNC FROM) " \
+           f"Author[jdoe] Mod:'M' Doc ID:doc-{index}\n"
+
+
+def noise_line(index: int) -> str:
+    timestamp = datetime.datetime(2019, 3, 12, 8, 0) + datetime.timedelta(seconds=index)
+    return f"{timestamp:%Y-%m-%d %H:%M:%S}.000 WARN Retrying request in {index % 7} seconds\n"
+
+
+def parse_file(file_path: str, **options) -> log_parser.ParseResult:
+    """Parse one file like a pool worker, the user being the name of its folder."""
+    user_name = os.path.basename(os.path.dirname(file_path))
+    options = log_parser.ParserOptions(sink='memory', **options)
+    task = log_parser.ParseTask(file_path, user_name, 'test', options, os.path.getsize(file_path))
+    return log_parser.Parser(task).parse()
+
+
+@pytest.fixture
+def log_folder(tmp_path):
+    """Return a function appending text to ``<tmp>/<user>/<name>`` and returning its path."""
+    def append(text: str, user: str = 'user01', name: str = 'serverdb_1.log') -> str:
+        user_path = tmp_path / user
+        user_path.mkdir(exist_ok=True)
+        file_path = user_path / name
+        with open(file_path, 'a', newline='\n') as writer:
+            writer.write(text)
+        return str(file_path)
+    return append
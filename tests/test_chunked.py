@@ -0,0 +1,178 @@
+import hashlib
+import shutil
+
+from serverdb_log_parser_multithreaded.__main__ import TaskPlan
+from serverdb_log_parser_multithreaded.log_parser.dedup_index import DedupIndex
+from serverdb_log_parser_multithreaded.log_parser.log_parser import Parser, ParserOptions, combine_chunk_hashes, \
+    split_file
+
+from conftest import noise_line, parse_file, sync_line
+
+
+def parse_chunked(folder_path: str, **options) -> TaskPlan:
+    """Plan the folder like parse_multi_process and run its tasks in this process."""
+    options = ParserOptions(sink='memory', chunk_size=300, chunk_threshold=1, **options)
+    plan = TaskPlan('test', options, DedupIndex())
+    results = [Parser(task).parse() for task in plan.tasks(folder_path)]
+    results += [Parser(task).parse() for task in plan.resume_tasks(results)]
+    plan.complete_chunked_files(results)
+    return plan
+
+
+def test_chunks_end_on_a_newline(log_folder):
+    file_path = log_folder(''.join(sync_line(index) for index in range(20)))
+    data = open(file_path, 'rb').read()
+
+    ranges = split_file(file_path, 300)
+
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert all(data[end - 1:end] == b'\n' for _, end in ranges)
+
+
+def test_chunked_file_is_complete_once_every_chunk_is_parsed(store, log_folder, tmp_path):
+    file_path = log_folder(''.join(sync_line(index) for index in range(20)))
+
+    plan = parse_chunked(str(tmp_path))
+
+    version, = store.versions()
+    assert len(plan.chunked_files[version.id].ranges) > 1
+    assert version.is_parsing_complete
+    assert version.lines_parsed == 20
+    assert version.bytes_parsed == len(open(file_path, 'rb').read())
+    assert sorted(row['document_id'] for row in store.rows('log_data')) == \
+        sorted(f"doc-{index}" for index in range(20))
+
+    parse_chunked(str(tmp_path))
+    assert len(store.rows('log_data')) == 20
+
+
+def test_chunked_file_with_a_failed_chunk_stays_incomplete(store, log_folder, tmp_path):
+    log_folder(''.join(sync_line(index) for index in range(20)))
+    options = ParserOptions(sink='memory', chunk_size=300, chunk_threshold=1)
+    plan = TaskPlan('test', options, DedupIndex())
+    results = [Parser(task).parse() for task in list(plan.tasks(str(tmp_path)))[1:]]
+
+    assert plan.complete_chunked_files(results) == set()
+    version, = store.versions()
+    assert not version.is_parsing_complete
+
+
+def test_chunk_digests_make_the_file_hash(store, log_folder, tmp_path):
+    file_path = log_folder(''.join(sync_line(index) for index in range(20)))
+    data = open(file_path, 'rb').read()
+
+    parse_chunked(str(tmp_path))
+
+    version, = store.versions()
+    ranges = split_file(file_path, 300)
+    assert [chunk['end'] for chunk in version.chunk_hashes] == [end for _, end in ranges]
+    assert [chunk['md5'] for chunk in version.chunk_hashes] == \
+        [hashlib.md5(data[start:end]).hexdigest() for start, end in ranges]
+    assert version.file_hash == combine_chunk_hashes([chunk['md5'] for chunk in version.chunk_hashes])
+
+
+def test_grown_file_prefix_is_hashed_by_the_workers(store, log_folder, tmp_path):
+    log_folder(''.join(sync_line(index) for index in range(20)))
+    parse_chunked(str(tmp_path))
+    log_folder(''.join(sync_line(index) for index in range(20, 30)))
+    version, = store.versions()
+
+    options = ParserOptions(sink='memory', chunk_size=300, chunk_threshold=1)
+    tasks = list(TaskPlan('test', options, DedupIndex()).tasks(str(tmp_path)))
+
+    assert all(task.hash_only for task in tasks)
+    assert sorted(task.chunk[2] for task in tasks) == [chunk['end'] for chunk in version.chunk_hashes]
+
+
+def test_chunked_file_resumes_the_appended_tail(store, log_folder, tmp_path):
+    lines = [sync_line(index) for index in range(30)]
+    log_folder(''.join(lines[:20]) + lines[20][:25])
+    parse_chunked(str(tmp_path))
+
+    log_folder(lines[20][25:] + ''.join(lines[21:]))
+    parse_chunked(str(tmp_path))
+
+    version, = store.versions()
+    assert version.is_parsing_complete
+    assert version.lines_parsed == 30
+    assert len(store.rows('log_data')) == 30
+    assert store.rows('unparsed_data') == []
+
+
+def test_chunked_file_is_resumed_in_one_piece(store, log_folder, tmp_path):
+    file_path = log_folder(''.join(sync_line(index) for index in range(20)))
+    parse_chunked(str(tmp_path))
+    log_folder(''.join(sync_line(index) for index in range(20, 25)))
+
+    assert parse_file(file_path).lines == 5
+    version, = store.versions()
+    assert version.lines_parsed == 25
+    assert version.file_hash == hashlib.md5(open(file_path, 'rb').read()).hexdigest()
+    assert len(store.rows('log_data')) == 25
+
+
+def test_changed_prefix_is_parsed_again_in_a_new_version(store, log_folder, tmp_path):
+    file_path = log_folder(''.join(sync_line(index) for index in range(20)))
+    parse_chunked(str(tmp_path))
+    first, = store.versions()
+    with open(file_path, 'w', newline='\n') as writer:
+        writer.write(''.join(sync_line(index, 'Hull_B') for index in range(25)))
+
+    parse_chunked(str(tmp_path))
+
+    assert len(store.versions()) == 2
+    second, = [version for version in store.versions() if version.id != first.id]
+    assert second.is_parsing_complete and second.lines_parsed == 25
+    assert len(store.rows('log_data')) == 45
+
+
+def test_interrupted_file_with_a_changed_prefix_is_purged(store, log_folder, tmp_path):
+    file_path = log_folder(''.join(sync_line(index) for index in range(20)))
+    parse_chunked(str(tmp_path))
+    log_folder(''.join(sync_line(index) for index in range(20, 30)))
+    options = ParserOptions(sink='memory', chunk_size=300, chunk_threshold=1)
+    plan = TaskPlan('test', options, DedupIndex())
+    results = [Parser(task).parse() for task in plan.tasks(str(tmp_path))]
+    # the tail tasks never run, the version stays interrupted
+    assert plan.resume_tasks(results)
+    with open(file_path, 'w', newline='\n') as writer:
+        writer.write(''.join(sync_line(index, 'Hull_B') for index in range(30)))
+
+    parse_chunked(str(tmp_path))
+
+    version, = store.versions()
+    assert version.is_parsing_complete and version.lines_parsed == 30
+    assert {row['database_name'] for row in store.rows('log_data')} == {'Hull_B'}
+
+
+def test_full_dedup_skips_a_chunked_copy(store, log_folder, tmp_path):
+    file_path = log_folder(''.join(sync_line(index) for index in range(20)))
+    parse_chunked(str(tmp_path), dedup='full')
+    copy_folder = tmp_path / 'copy'
+    shutil.copytree(tmp_path / 'user01', copy_folder / 'user01')
+
+    plan = parse_chunked(str(copy_folder), dedup='full')
+
+    assert len(store.versions()) == 1
+    assert len(store.rows('log_data')) == 20
+    assert plan.chunked_files
+
+
+def test_chunk_patterns_are_written_once_the_file_is_complete(store, log_folder, tmp_path):
+    log_folder(''.join(noise_line(index) if index % 2 else sync_line(index) for index in range(20)))
+
+    parse_chunked(str(tmp_path), unparsed_mode='cluster')
+
+    pattern, = store.rows('unparsed_pattern')
+    assert pattern['count'] == 10
+    assert pattern['file_version_data'] == store.versions()[0].id
+
+
+def test_chunk_rollups_are_written_once_the_file_is_complete(store, log_folder, tmp_path):
+    log_folder(''.join(sync_line(index) for index in range(20)))
+
+    parse_chunked(str(tmp_path), rollups=True)
+
+    assert sum(rollup['total'] for rollup in store.rows('sync_rollup')) == 20
@@ -0,0 +1,74 @@
+import bz2
+import gzip
+import hashlib
+import lzma
+
+import pytest
+
+from conftest import parse_file, sync_line
+from serverdb_log_parser_multithreaded.log_parser.compression import HashingReader, open_decompressed
+from serverdb_log_parser_multithreaded.log_parser.log_parser import ParseStatus
+
+
+def zstd_compress(data: bytes) -> bytes:
+    zstandard = pytest.importorskip('zstandard')
+    return zstandard.ZstdCompressor().compress(data)
+
+
+COMPRESSORS = {'.gz': gzip.compress, '.bz2': bz2.compress, '.xz': lzma.compress, '.zst': zstd_compress}
+
+
+@pytest.fixture(params=sorted(COMPRESSORS))
+def suffix(request) -> str:
+    return request.param
+
+
+def write_archive(tmp_path, suffix: str, data: bytes) -> str:
+    user_path = tmp_path / 'user01'
+    user_path.mkdir(exist_ok=True)
+    file_path = user_path / f"serverdb_1.log{suffix}"
+    file_path.write_bytes(COMPRESSORS[suffix](data))
+    return str(file_path)
+
+
+def test_decompressed_stream_hashes_the_compressed_bytes(tmp_path, suffix):
+    data = ''.join(sync_line(index) for index in range(1000)).encode()
+    file_path = write_archive(tmp_path, suffix, data)
+    md5 = hashlib.md5()
+
+    with open(file_path, 'rb') as reader:
+        hashing_reader = HashingReader(reader, md5)
+        with open_decompressed(hashing_reader, file_path) as decompressed:
+            assert b''.join(decompressed) == data
+        hashing_reader.drain()
+        assert not reader.closed
+
+    assert md5.hexdigest() == hashlib.md5(open(file_path, 'rb').read()).hexdigest()
+
+
+def test_archive_is_parsed_to_its_last_line(store, tmp_path, suffix):
+    lines = [sync_line(index) for index in range(50)]
+    # a rotated archive is complete, its last line counts without a newline
+    file_path = write_archive(tmp_path, suffix, ''.join(lines).rstrip('\n').encode())
+
+    result = parse_file(file_path, flush_size=7)
+
+    assert result.status == ParseStatus.PARSED and result.lines == 50
+    version, = store.versions()
+    assert version.is_parsing_complete
+    assert version.file_hash == hashlib.md5(open(file_path, 'rb').read()).hexdigest()
+    assert sorted(row['document_id'] for row in store.rows('log_data')) == sorted(f"doc-{index}" for index in range(50))
+
+
+@pytest.mark.parametrize('dedup', ['quick', 'full'])
+def test_parsed_archive_is_skipped(store, tmp_path, suffix, dedup):
+    file_path = write_archive(tmp_path, suffix, ''.join(sync_line(index) for index in range(5)).encode())
+    parse_file(file_path, dedup=dedup)
+
+    assert parse_file(file_path, dedup=dedup).status == ParseStatus.SKIPPED
+    assert len(store.rows('log_data')) == 5
+
+
+def test_unknown_suffix_is_refused(tmp_path):
+    with open(__file__, 'rb') as reader, pytest.raises(ValueError):
+        open_decompressed(reader, 'serverdb_1.log.zip')
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from serverdb_log_parser_multithreaded.log_parser import dedup_index
+from serverdb_log_parser_multithreaded.log_parser.dedup_index import DedupIndex
+
+
+class FakeQuery:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def only(self, *fields):
+        return self
+
+    def as_pymongo(self):
+        return iter(self.documents)
+
+
+def load(monkeypatch, documents):
+    class FileVersionData:
+        @staticmethod
+        def objects(**query):
+            return FakeQuery(documents)
+
+    monkeypatch.setattr(dedup_index, 'FileVersionData', FileVersionData)
+    return DedupIndex.from_database()
+
+
+def test_manifest_round_trip(tmp_path):
+    manifest_path = str(tmp_path / 'manifest.json')
+    index = DedupIndex()
+    index.add('logs/user01/serverdb_1.log', 'user01', 120, 1552385742.123456)
+    index.add('logs/user02/serverdb_1.log', 'user02', 80, 1552385743.0)
+    index.save(manifest_path)
+    assert not os.path.exists(manifest_path + '.tmp')
+
+    loaded = DedupIndex.from_manifest(manifest_path)
+    assert len(loaded) == 2
+    assert loaded.contains('logs/user01/serverdb_1.log', 'user01', 120, 1552385742.123456)
+    assert loaded.contains(os.path.abspath('logs/user02/serverdb_1.log'), 'user02', 80, 1552385743.0)
+    assert not loaded.contains('logs/user01/serverdb_1.log', 'user01', 121, 1552385742.123456)
+    assert not loaded.contains('logs/user01/serverdb_1.log', 'user01', 120, 1552385744.0)
+
+
+def test_missing_manifest_is_empty(tmp_path):
+    assert len(DedupIndex.from_manifest(str(tmp_path / 'manifest.json'))) == 0
+
+
+def test_entries_are_kept_per_user():
+    index = DedupIndex()
+    index.add('shared/serverdb_1.log', 'user01', 120, 1.0)
+    assert index.contains('shared/serverdb_1.log', 'user01', 120, 1.0)
+    assert not index.contains('shared/serverdb_1.log', 'user02', 120, 1.0)
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_newest_version_wins_in_any_load_order(monkeypatch, reverse):
+    documents = [
+        {'file_path': '/logs/user01/serverdb_1.log', 'user_name': 'user01', 'file_size': 100, 'file_mtime': 1.0,
+         'bytes_parsed': 100},
+        {'file_path': '/logs/user01/serverdb_1.log', 'user_name': 'user01', 'file_size': 250, 'file_mtime': 2.0,
+         'bytes_parsed': 250},
+        {'file_path': '/logs/user01/serverdb_1.log', 'user_name': 'user02', 'file_size': 100, 'file_mtime': 1.0,
+         'bytes_parsed': 100},
+        {'user_name': 'user01', 'file_size': 10},
+    ]
+    index = load(monkeypatch, documents[::-1] if reverse else documents)
+    assert len(index) == 2
+    assert index.contains('/logs/user01/serverdb_1.log', 'user01', 250, 2.0)
+    assert not index.contains('/logs/user01/serverdb_1.log', 'user01', 100, 1.0)
+    assert index.contains('/logs/user01/serverdb_1.log', 'user02', 100, 1.0)
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from serverdb_log_parser_multithreaded.log_parser.discovery import find_log_files, is_log_file, iter_log_files
+
+
+@pytest.mark.parametrize('file_name, expected', [
+    ('serverdb_1.log', True),
+    ('serverdb_2019-03-12.log', True),
+    ('serverdb_1.log.gz', True),
+    ('serverdb_1.log.bz2', True),
+    ('serverdb_1.log.xz', True),
+    ('serverdb_1.log.zst', True),
+    ('serverdb_1.log.zip', False),
+    ('serverdb_1.txt', False),
+    ('client_1.log', False),
+    ('serverdb.log', False),
+])
+def test_log_file_names(file_name, expected):
+    assert is_log_file(file_name) == expected
+
+
+def test_only_log_files_in_user_folders_are_found(tmp_path):
+    for relative_path in ['user01/serverdb_1.log', 'user01/serverdb_2.log.gz', 'user01/notes.txt',
+                          'user02/serverdb_1.log', 'user02/archive/serverdb_3.log', 'serverdb_0.log']:
+        (tmp_path / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / relative_path).write_bytes(b'x' * len(relative_path))
+    # a folder named like a log is not a file
+    (tmp_path / 'user02' / 'serverdb_4.log').mkdir()
+
+    found = find_log_files(str(tmp_path), max_workers=2)
+
+    assert sorted((os.path.relpath(file_path, tmp_path), user_name) for file_path, user_name, _ in found) == [
+        ('user01/serverdb_1.log', 'user01'), ('user01/serverdb_2.log.gz', 'user01'),
+        ('user02/serverdb_1.log', 'user02')]
+    assert all(stat.st_size == len(os.path.relpath(file_path, tmp_path)) for file_path, _, stat in found)
+
+
+def test_files_are_yielded_in_batches_per_scanned_folder(tmp_path):
+    for index in range(5):
+        (tmp_path / f"user{index}").mkdir()
+        (tmp_path / f"user{index}" / 'serverdb_1.log').write_text('')
+    (tmp_path / 'empty').mkdir()
+
+    batches = list(iter_log_files(str(tmp_path), max_workers=1))
+
+    assert sorted(user_name for batch in batches for _, user_name, _ in batch) == \
+        [f"user{index}" for index in range(5)]
@@ -0,0 +1,46 @@
+from serverdb_log_parser_multithreaded.log_parser import follower
+from serverdb_log_parser_multithreaded.log_parser.follower import FollowedFile
+from serverdb_log_parser_multithreaded.log_parser.log_parser import ParserOptions, ParseStatus
+
+from conftest import parse_file, sync_line
+
+
+def follow(file_path: str, polls: int = None, **options) -> FollowedFile:
+    """Follow a file until it has been read to the end, or for ``polls`` polls, then stop."""
+    followed = FollowedFile(file_path, 'user01', 'test', ParserOptions(sink='memory', **options))
+    while followed.poll() and polls != 1:
+        polls = polls and polls - 1
+    followed.close()
+    return followed
+
+
+def test_restarted_follower_does_not_parse_the_file_again(store, log_folder):
+    file_path = log_folder(''.join(sync_line(index) for index in range(5)))
+    follow(file_path)
+    follow(file_path)
+    log_folder(sync_line(5))
+    follow(file_path)
+    follow(file_path)
+
+    assert len(store.rows('log_data')) == 6
+    assert all(version.is_parsing_complete for version in store.versions())
+    assert parse_file(file_path).status == ParseStatus.SKIPPED
+
+
+def test_follower_stopped_before_the_end_leaves_the_rest_to_parse(store, log_folder, monkeypatch):
+    monkeypatch.setattr(follower, 'READ_BUFFER_SIZE', 300)
+    file_path = log_folder(''.join(sync_line(index) for index in range(10)))
+    follow(file_path, polls=1)
+    assert 0 < len(store.rows('log_data')) < 10
+
+    assert parse_file(file_path).status == ParseStatus.PARSED
+    assert len(store.rows('log_data')) == 10
+
+
+def test_follower_writes_its_rollups_with_every_save(store, log_folder):
+    file_path = log_folder(''.join(sync_line(index) for index in range(5)))
+    follow(file_path, rollups=True)
+    log_folder(sync_line(5))
+    follow(file_path, rollups=True)
+
+    assert sum(rollup['total'] for rollup in store.rows('sync_rollup')) == 6
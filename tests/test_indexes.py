@@ -0,0 +1,64 @@
+import pytest
+
+from serverdb_log_parser_multithreaded import __main__ as cli
+from serverdb_log_parser_multithreaded.database import connection, indexes
+from serverdb_log_parser_multithreaded.database.db_schema import LogData
+
+
+class FakeCollection:
+    def __init__(self, keys):
+        self.indexes = {'_'.join(f"{field}_{order}" for field, order in key): key for key in keys}
+
+    def index_information(self):
+        return {name: {'key': key} for name, key in self.indexes.items()}
+
+    def drop_index(self, name):
+        del self.indexes[name]
+
+    def create_index(self, field):
+        self.indexes[f"{field}_1"] = [(field, 1)]
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeCollection([[('_id', 1)], [('file_version_data', 1)], [('user_name', 1), ('date_time', 1)],
+                                 [('database_name', 1), ('date_time', 1)]])
+    monkeypatch.setattr(LogData, '_get_collection', lambda: collection)
+    return collection
+
+
+def test_bulk_load_keeps_the_file_version_data_index(collection):
+    indexes.drop_log_data_indexes()
+    assert sorted(collection.indexes) == ['_id_1', 'file_version_data_1']
+
+
+def test_deferred_log_data_indexes_only_create_file_version_data(monkeypatch):
+    collection = FakeCollection([[('_id', 1)]])
+    monkeypatch.setattr(LogData, '_get_collection', lambda: collection)
+    ensured = []
+    for document_class in (indexes.FileVersionData, indexes.LogData, indexes.UnparsedData, indexes.UnparsedPattern,
+                           indexes.SyncRollup, indexes.LogDataBatch):
+        monkeypatch.setattr(document_class, 'ensure_indexes',
+                            classmethod(lambda cls: ensured.append(cls.__name__)))
+    indexes.create_indexes(defer_log_data=True)
+    assert 'LogData' not in ensured and len(ensured) == 5
+    assert sorted(collection.indexes) == ['_id_1', 'file_version_data_1']
+    indexes.create_indexes()
+    assert 'LogData' in ensured
+
+
+def test_failed_bulk_load_still_rebuilds_the_indexes(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(connection, 'connect_database', lambda *args, **kwargs: calls.append('connect'))
+    monkeypatch.setattr(connection, 'disconnect_database', lambda: calls.append('disconnect'))
+    monkeypatch.setattr(indexes, 'drop_log_data_indexes', lambda: calls.append('drop'))
+    monkeypatch.setattr(indexes, 'create_indexes',
+                        lambda defer_log_data=False: calls.append('defer' if defer_log_data else 'create'))
+
+    def parse_multi_process(*args):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(cli, 'parse_multi_process', parse_multi_process)
+    with pytest.raises(KeyboardInterrupt):
+        cli.main(['-p', str(tmp_path), '--bulk-load'])
+    assert calls == ['connect', 'drop', 'defer', 'disconnect', 'connect', 'create']
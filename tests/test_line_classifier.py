@@ -0,0 +1,92 @@
+import itertools
+import re
+
+import pytest
+
+from serverdb_log_parser_multithreaded.log_parser.line_classifier import LineKind, classify
+
+# the patterns of the Result chain the classifier replaced, tried in this order
+Sync_log_entry_pattern = re.compile(
+    r"^(?P<syncdatetime>.*?) INFO \[(?P<database_name>.*?)\] \((?P<sync_mode>.*?)\) "
+    r"Author\[(?P<author>.*?)\] Mod:'(?P<modification_type>.*?)' Doc ID:(?P<doc_id>.*)")
+Sync_log_entry_pattern_skipped = re.compile(
+    r"^(?P<syncdatetime>.*?) INFO \[(?P<database_name>.*?)\] \((?P<sync_mode>.*?)\) "
+    r"\[Skipped\].(?P<error_message>.*?) Doc ID:(?P<doc_id>.*)")
+Sync_log_entry_error_pattern = re.compile(r"^(?P<syncdatetime>.*?) ERROR (?P<error_message>.*)")
+Sync_log_entry_to_be_no_parsed = re.compile(
+    "(Starting to sync|Starting at|Sync from Master done|Sync from Master started|Sync into Master"
+    "|Stopping the Sync|Ending at)")
+
+# the classifier's group for each group of the old patterns
+GROUPS = {
+    LineKind.SYNC: {name: name for name in Sync_log_entry_pattern.groupindex},
+    LineKind.SKIPPED: {'syncdatetime': 'syncdatetime', 'database_name': 'database_name', 'sync_mode': 'sync_mode',
+                       'error_message': 'skipped_message', 'doc_id': 'skipped_doc_id'},
+    LineKind.ERROR: {name: name for name in Sync_log_entry_error_pattern.groupindex},
+}
+
+LINES = [
+    "2019-03-12 10:15:42.123 INFO [Hull_A] (SYNC FROM) Author[jdoe] Mod:'M' Doc ID:4f1c2a9e-77aa\n",
+    "2019-03-12 10:15:42.456 INFO [Hull_A] (SYNC INTO) Author[asmith] Mod:'N' Doc ID:0a9b8c7d\n",
+    "2019-03-12 10:15:42.456 INFO [Hull_A] (SYNC INTO) Author[] Mod:'' Doc ID:\n",
+    "2019-03-12 10:15:43.001 INFO [Hull_A] (SYNC FROM) [Skipped] Locked by another user Doc ID:77aa4c1b\n",
+    "2019-03-12 10:15:43.001 INFO [Hull_A] (SYNC FROM) [Skipped]:Newer version on master Doc ID:1 Doc ID:2\n",
+    "2019-03-12 10:15:43.250 ERROR Connection to master lost, retrying\n",
+    "2019-03-12 10:15:43.250 ERROR \n",
+    "2019-03-12 10:15:40.000 INFO Starting to sync database Hull_A\n",
+    "2019-03-12 10:15:44.000 INFO Sync from Master done\n",
+    "2019-03-12 10:15:44.000 INFO Ending at 10:15\n",
+    "2019-03-12 10:15:45.000 WARN Unexpected response from server\n",
+    "2019-03-12 10:15:45.000 INFO [Hull_A] (SYNC FROM) Author[jdoe] Mod:'M'\n",
+    "2019-03-12 10:15:45.000 INFO [Hull_A] (SYNC FROM) Locked Doc ID:1\n",
+    "2019-03-12 10:15:45.000 INFO [Hull_A] Starting at the master\n",
+    "2019-03-12 10:15:45.000 ERROR Could not sync INFO [Hull_A] (SYNC FROM) Author[jdoe] Mod:'M' Doc ID:1\n",
+    "2019-03-12 10:15:45.000 ERROR Stopping the Sync\n",
+    "2019-03-12 10:15:45.000 WARN ERROR count INFO [Hull_A] (SYNC FROM) [Skipped] x Doc ID:1\n",
+    "2019-03-12 10:15:45.000 INFO [Hull_A] (SYNC FROM) [Skipped] x Doc ID:1 INFO [Hull_B] (SYNC INTO) "
+    "Author[jdoe] Mod:'M' Doc ID:2\n",
+    "prefix INFO [a] (b) Author[c] Mod:'d' Doc ID:e INFO [f] (g) Author[h] Mod:'i' Doc ID:j\n",
+    "INFO [Hull_A] (SYNC FROM) Author[jdoe] Mod:'M' Doc ID:1\n",
+    " INFO [Hull_A] (SYNC FROM) Author[jdoe] Mod:'M' Doc ID:1\n",
+    "ERROR at the start\n",
+    " ERROR after a space\n",
+    "\n",
+    "",
+    "2019-03-12 10:15:45.000 INFO [Hull_A] (SYNC FROM) Author[jdoe] Mod:'M' Doc ID:1\r\n",
+]
+
+# every line of up to four of these, in any order
+FRAGMENTS = ["2019-03-12 10:15:42.123", " INFO [Hull_A]", " (SYNC FROM)", " Author[jdoe] Mod:'M'",
+             " Doc ID:1", " [Skipped] x", " ERROR oops", " Starting at", " WARN"]
+
+
+def legacy_classify(line: str):
+    """Classify a line like the chain of the old Parser, with the fields of the pattern that matched."""
+    for kind, pattern in ((LineKind.SYNC, Sync_log_entry_pattern),
+                          (LineKind.SKIPPED, Sync_log_entry_pattern_skipped),
+                          (LineKind.ERROR, Sync_log_entry_error_pattern)):
+        match = pattern.match(line)
+        if match is not None:
+            return kind, match.groupdict()
+    if any(Sync_log_entry_to_be_no_parsed.findall(line)):
+        return LineKind.IGNORED, None
+    return LineKind.UNPARSED, None
+
+
+@pytest.mark.parametrize('line', LINES)
+def test_classifier_matches_the_result_chain(line):
+    kind, fields = legacy_classify(line)
+
+    classified_kind, match = classify(line)
+
+    assert classified_kind == kind
+    if fields is None:
+        assert match is None
+    else:
+        assert {name: match.group(group) for name, group in GROUPS[kind].items()} == fields
+
+
+def test_classifier_matches_the_result_chain_for_every_fragment_order():
+    for fragments in itertools.product(FRAGMENTS, repeat=4):
+        line = ''.join(fragments) + '\n'
+        test_classifier_matches_the_result_chain(line)
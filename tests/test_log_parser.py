@@ -0,0 +1,196 @@
+import gzip
+import os
+
+import pytest
+
+from conftest import Crash, StoreSink, noise_line, parse_file, sync_line
+from serverdb_log_parser_multithreaded.__main__ import run_parser
+from serverdb_log_parser_multithreaded.log_parser.log_parser import ParserOptions, ParseStatus, ParseTask
+
+
+def test_write_error_fails_the_task(store, log_folder, monkeypatch):
+    def write(self, collection, documents):
+        raise OSError("connection lost")
+    monkeypatch.setattr(StoreSink, 'write', write)
+    file_path = log_folder(''.join(sync_line(index) for index in range(5)))
+    options = ParserOptions(sink='memory', flush_size=2)
+
+    result = run_parser(ParseTask(file_path, 'user01', 'test', options, os.path.getsize(file_path)))
+
+    assert result.status == ParseStatus.FAILED
+    assert result.error == "OSError: connection lost"
+    assert not any(version.is_parsing_complete for version in store.versions())
+    assert store.rows('unparsed_data') == []
+
+
+def test_rows_are_written_in_batches(store, log_folder):
+    file_path = log_folder(''.join(sync_line(index) for index in range(25)))
+
+    assert parse_file(file_path, flush_size=10).lines == 25
+
+    assert len(store.rows('log_data')) == 25
+    assert store.writes == 3
+
+
+@pytest.mark.parametrize('dedup', ['quick', 'full'])
+def test_parsed_file_is_skipped(store, log_folder, dedup):
+    file_path = log_folder(''.join(sync_line(index) for index in range(5)))
+    assert parse_file(file_path, dedup=dedup).status == ParseStatus.PARSED
+
+    assert parse_file(file_path, dedup=dedup).status == ParseStatus.SKIPPED
+    assert len(store.versions()) == 1
+    assert len(store.rows('log_data')) == 5
+
+
+def test_full_dedup_skips_a_file_ending_in_a_partial_line(store, log_folder):
+    file_path = log_folder(''.join(sync_line(index) for index in range(5)) + sync_line(5)[:20])
+    parse_file(file_path, dedup='full')
+
+    assert parse_file(file_path, dedup='full').status == ParseStatus.SKIPPED
+
+
+def test_full_dedup_skips_a_touched_file(store, log_folder):
+    file_path = log_folder(''.join(sync_line(index) for index in range(5)))
+    parse_file(file_path, dedup='full')
+    os.utime(file_path, (0, 0))
+
+    assert parse_file(file_path, dedup='full').status == ParseStatus.SKIPPED
+
+
+def test_appended_tail_is_parsed_alone(store, log_folder):
+    file_path = log_folder(''.join(sync_line(index) for index in range(5)))
+    parse_file(file_path)
+    log_folder(''.join(sync_line(index) for index in range(5, 8)))
+
+    assert parse_file(file_path).lines == 3
+    version, = store.versions()
+    assert version.lines_parsed == 8
+    assert len(store.rows('log_data')) == 8
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_partial_last_line_is_left_for_the_resume(store, log_folder, use_mmap):
+    lines = [sync_line(index) for index in range(5)]
+    file_path = log_folder(''.join(lines[:3]) + lines[3][:30])
+    assert parse_file(file_path, use_mmap=use_mmap).lines == 3
+
+    log_folder(lines[3][30:] + lines[4])
+    result = parse_file(file_path, use_mmap=use_mmap)
+
+    assert result.lines == 2
+    assert len(store.rows('log_data')) == 5
+    assert store.rows('unparsed_data') == []
+
+
+TRUNCATING_RUN = '''
+import os
+import sys
+
+from serverdb_log_parser_multithreaded.__main__ import parse_args, parse_multi_process
+from serverdb_log_parser_multithreaded.log_parser.log_parser import Parser, ParserOptions
+
+folder_path, output_path = sys.argv[1:3]
+parse_raw_line = Parser.parse_raw_line
+
+
+def truncating_parse_raw_line(self, raw_line, file_version_data):
+    # the file shrinks under the worker, like a log rotated by copytruncate
+    if self._lines == 0:
+        os.truncate(self.file_path, 0)
+    parse_raw_line(self, raw_line, file_version_data)
+
+
+Parser.parse_raw_line = truncating_parse_raw_line
+args = parse_args(['-p', folder_path, '--sink', 'sqlite', '-o', output_path] + sys.argv[3:])
+options = ParserOptions(sink='sqlite', output_path=output_path, use_mmap=args.use_mmap)
+print(f"results: {len(parse_multi_process(folder_path, 'test', options))}")
+'''
+
+
+def test_truncated_file_does_not_hang_the_pool(log_folder, tmp_path):
+    import subprocess
+    import sys
+    log_folder(''.join(sync_line(index) for index in range(30000)))
+
+    run = subprocess.run([sys.executable, '-c', TRUNCATING_RUN, str(tmp_path), str(tmp_path / 'out.db')],
+                         env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+                         capture_output=True, text=True, timeout=60)
+
+    assert run.returncode == 0, run.stderr
+    assert "results: 1" in run.stdout
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+@pytest.mark.parametrize('async_pipeline', [False, True])
+def test_crashed_parse_resumes_without_duplicates(store, log_folder, use_mmap, async_pipeline):
+    file_path = log_folder(''.join(sync_line(index) for index in range(200)))
+    options = dict(flush_size=10, checkpoint_interval=0, use_mmap=use_mmap, async_pipeline=async_pipeline)
+    store.fail_write = 7
+    with pytest.raises(Crash):
+        parse_file(file_path, **options)
+    assert 0 < len(store.rows('log_data')) < 200
+
+    store.fail_write = None
+    result = parse_file(file_path, **options)
+
+    assert result.lines < 200
+    version, = store.versions()
+    assert version.is_parsing_complete
+    assert version.lines_parsed == 200
+    assert sorted(row['document_id'] for row in store.rows('log_data')) == \
+        sorted(f"doc-{index}" for index in range(200))
+
+
+def event_line(index: int) -> str:
+    """An unparsed line of one of ten templates, five for odd indexes."""
+    return noise_line(index).replace('Retrying request', f"Event {'abcdefghij'[index % 10]} retrying")
+
+
+def test_unparsed_patterns_are_counted_once_across_a_resume(store, log_folder):
+    lines = [event_line(index) if index % 2 else sync_line(index) for index in range(200)]
+    file_path = log_folder(''.join(lines))
+    options = dict(unparsed_mode='cluster', flush_size=5, checkpoint_interval=3600)
+    store.fail_write = 8
+    with pytest.raises(Crash):
+        parse_file(file_path, **options)
+
+    # only the patterns of the checkpointed prefix are stored
+    version, = store.versions()
+    prefix = open(file_path, 'rb').read()[:version.bytes_parsed or 0]
+    assert sum(pattern['count'] for pattern in store.rows('unparsed_pattern')) == prefix.count(b'Event')
+
+    store.fail_write = None
+    assert parse_file(file_path, **options).status == ParseStatus.PARSED
+    assert sum(pattern['count'] for pattern in store.rows('unparsed_pattern')) == 100
+    assert len(store.rows('unparsed_pattern')) == 5
+    assert len(store.rows('log_data')) == 100
+
+
+def test_rollups_are_written_with_the_checkpoints(store, log_folder):
+    file_path = log_folder(''.join(sync_line(index) for index in range(100)))
+    store.fail_write = 5
+    with pytest.raises(Crash):
+        parse_file(file_path, rollups=True, flush_size=10, checkpoint_interval=0)
+    version, = store.versions()
+    assert sum(rollup['total'] for rollup in store.rows('sync_rollup')) == version.lines_parsed > 0
+
+    store.fail_write = None
+    parse_file(file_path, rollups=True, flush_size=10, checkpoint_interval=0)
+    assert sum(rollup['total'] for rollup in store.rows('sync_rollup')) == 100
+    assert len(store.rows('log_data')) == 100
+
+
+
+def test_deterministic_ids_are_shared_by_compressed_copies_only(store, log_folder):
+    text = ''.join(sync_line(index) for index in range(5))
+    file_path = log_folder(text)
+    with gzip.open(file_path + '.gz', 'wt', newline='\n') as writer:
+        writer.write(text)
+    other_path = log_folder(text, name='serverdb_2.log')
+
+    parse_file(file_path, deterministic_ids=True)
+    parse_file(file_path + '.gz', deterministic_ids=True)
+    assert len(store.rows('log_data')) == 5
+
+    parse_file(other_path, deterministic_ids=True)
+    assert len(store.rows('log_data')) == 10
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from serverdb_log_parser_multithreaded.log_parser.log_parser import ParseResult, ParseStatus
+from serverdb_log_parser_multithreaded.log_parser.metrics import MetricsReport, ParseMetrics
+
+
+def metrics(lines, bytes_read, write_time=0.0, duration=1.0) -> ParseMetrics:
+    parse_metrics = ParseMetrics()
+    parse_metrics.lines = list(lines)
+    parse_metrics.bytes_read = bytes_read
+    parse_metrics.write_time = write_time
+    parse_metrics.duration = duration
+    return parse_metrics
+
+
+@pytest.fixture
+def report() -> MetricsReport:
+    return MetricsReport([
+        # two chunks of one file, parsed by two workers
+        ParseResult('/logs/user01/serverdb_1.log', 'user01', ParseStatus.PARSED, chunk=('id', 0, 100),
+                    worker_id=11, metrics=metrics([8, 1, 1, 0, 0], 1024 ** 2, write_time=0.5)),
+        ParseResult('/logs/user01/serverdb_1.log', 'user01', ParseStatus.PARSED, chunk=('id', 100, 200),
+                    worker_id=12, metrics=metrics([5, 0, 0, 2, 3], 1024 ** 2, write_time=0.25)),
+        ParseResult('/logs/user02/serverdb_1.log', 'user02', ParseStatus.PARSED,
+                    worker_id=11, metrics=metrics([4, 0, 0, 0, 0], 512 * 1024)),
+        ParseResult('/logs/user03/serverdb_1.log', 'user03', ParseStatus.FAILED, error="OSError: gone"),
+    ])
+
+
+def test_results_add_up_per_file_worker_and_total(report):
+    assert sorted(report.files) == ['user01/serverdb_1.log', 'user02/serverdb_1.log']
+    assert report.files['user01/serverdb_1.log'].lines == [13, 1, 1, 2, 3]
+    assert report.workers[11].line_count == 14 and report.workers[12].line_count == 10
+    assert report.total.line_count == 24
+    assert report.total.bytes_read == 2.5 * 1024 ** 2
+    assert report.total.write_time == 0.75
+    assert report.statuses == {ParseStatus.PARSED: 3, ParseStatus.FAILED: 1}
+
+
+def test_table_has_a_row_per_file_worker_and_total(report):
+    table = report.format_table().splitlines()
+
+    assert table[0].split() == ['lines', 'sync', 'skipped', 'error', 'ignored', 'unparsed', 'MB',
+                                'regex', 's', 'timestamp', 's', 'write', 's', 'total', 's']
+    # the label, then lines, five categories, MB, three stages and the total
+    rows = {label: values for label, *values in (line.rsplit(None, 11) for line in table[1:]
+                                                if not line.startswith('-'))}
+    assert rows['user01/serverdb_1.log'][:6] == ['20', '13', '1', '1', '2', '3']
+    assert rows['worker 12'][0] == '10'
+    assert rows['total'][:7] == ['24', '17', '1', '1', '2', '3', '2.5']
+    assert len({len(line) for line in table}) == 1
+
+
+def test_json_report(report, tmp_path):
+    report_path = str(tmp_path / 'metrics.json')
+    report.save_json(report_path)
+
+    saved = json.load(open(report_path))
+    assert saved['statuses'] == {'parsed': 3, 'failed': 1}
+    assert saved['total']['lines'] == {'sync': 17, 'skipped': 1, 'error': 1, 'ignored': 2, 'unparsed': 3}
+    assert saved['total']['seconds']['write'] == 0.75
+    assert set(saved['workers']) == {'11', '12'}
+    assert saved['files']['user02/serverdb_1.log']['bytes_read'] == 512 * 1024
+
+
+def test_textfile_report(report, tmp_path):
+    report_path = str(tmp_path / 'metrics.prom')
+    report.save_textfile(report_path)
+
+    samples = dict(line.rsplit(' ', 1) for line in open(report_path).read().splitlines()
+                   if not line.startswith('#'))
+    assert samples['serverdb_log_parser_files{status="failed"}'] == '1'
+    assert samples['serverdb_log_parser_lines{category="unparsed"}'] == '3'
+    assert samples['serverdb_log_parser_bytes'] == str(int(2.5 * 1024 ** 2))
+    assert float(samples['serverdb_log_parser_seconds{stage="total"}']) == 3.0
+    assert not (tmp_path / 'metrics.prom.tmp').exists()
@@ -0,0 +1,72 @@
+import datetime
+
+import bson
+from bson import ObjectId
+
+from conftest import noise_line, parse_file, sync_line
+from serverdb_log_parser_multithreaded.log_parser.records import LOG_BATCH_COLLECTION, LogRecord, \
+    decode_log_batch, encode_log_batch
+
+FILE_VERSION_ID = ObjectId()
+TIME = datetime.datetime(2019, 3, 12, 10, 15, 42, 123000)
+
+RECORDS = [
+    LogRecord(FILE_VERSION_ID, 'user01', TIME, database_name='Hull_A', sync_mode='SYNCFROM', author='jdoe',
+              modification_type='MODIFIED', document_id='doc-1', is_skipped=False, is_error=False),
+    LogRecord(FILE_VERSION_ID, 'user01', TIME, database_name='Hull_B', sync_mode='SYNCFROM', author='jdoe',
+              modification_type='NEW', document_id='doc-2', is_skipped=False, is_error=False),
+    LogRecord(FILE_VERSION_ID, 'user01', TIME, sync_mode='SYNCINTO', is_skipped=True, error_text='Locked'),
+    LogRecord(FILE_VERSION_ID, 'user01', TIME, is_error=True, error_text='Connection lost'),
+    LogRecord(FILE_VERSION_ID, 'user01', TIME, database_name='Hull_A', sync_mode='SYNCINTO', author='asmith',
+              modification_type='MODIFIED', document_id='doc-3', is_skipped=False, is_error=False),
+]
+
+
+def test_batch_decodes_to_the_row_documents():
+    document = encode_log_batch(RECORDS, batch_id=7)
+
+    assert document['count'] == 5 and document['batch_id'] == 7
+    assert list(decode_log_batch(document)) == [record.to_document(7) for record in RECORDS]
+
+
+def test_batch_survives_bson():
+    document = encode_log_batch(RECORDS, batch_id=3)
+
+    assert list(decode_log_batch(bson.decode(bson.encode(document)))) == \
+        [record.to_document(3) for record in RECORDS]
+
+
+def test_repeated_values_are_stored_once():
+    document = encode_log_batch(RECORDS)
+
+    assert document['dictionary']['database_name'] == ['Hull_A', 'Hull_B']
+    assert document['dictionary']['author'] == ['jdoe', 'asmith']
+    assert document['rows']['database_name'] == [0, 1, None, None, 0]
+    assert document['rows']['document_id'] == ['doc-1', 'doc-2', None, None, 'doc-3']
+
+
+def test_unset_columns_are_left_out():
+    records = [record for record in RECORDS if record.is_error]
+    document = encode_log_batch(records)
+
+    assert set(document['rows']) == {'date_time', 'is_error', 'error_text'}
+    assert document['dictionary'] == {}
+    assert list(decode_log_batch(document)) == [record.to_document() for record in records]
+
+
+def test_compact_layout_stores_the_same_rows(store, log_folder):
+    lines = [noise_line(index) if index % 5 == 4 else sync_line(index, f"Hull_{index % 3}") for index in range(30)]
+    file_path = log_folder(''.join(lines))
+    parse_file(file_path, flush_size=7)
+    rows = store.rows('log_data')
+    store.collections.clear()
+    store.file_versions.clear()
+
+    parse_file(file_path, flush_size=7, compact_layout=True)
+
+    batches = store.rows(LOG_BATCH_COLLECTION)
+    assert len(batches) > 1 and store.rows('log_data') == []
+    decoded = [row for batch in batches for row in decode_log_batch(batch)]
+    ignored = ('file_version_data', 'batch_id')
+    assert [{name: value for name, value in row.items() if name not in ignored} for row in decoded] == \
+        [{name: value for name, value in row.items() if name not in ignored} for row in rows]
@@ -0,0 +1,100 @@
+import glob
+import gzip
+import os
+import sqlite3
+
+import pytest
+from bson import ObjectId, json_util
+
+from conftest import sync_line
+from serverdb_log_parser_multithreaded.log_parser.log_parser import Parser, ParserOptions, ParseStatus, ParseTask
+from serverdb_log_parser_multithreaded.storage.sink import create_sink
+
+
+def parse_to(sink: str, output_path: str, file_path: str, **options):
+    options = ParserOptions(sink=sink, output_path=output_path, flush_size=4, **options)
+    task = ParseTask(file_path, 'user01', 'test', options, os.path.getsize(file_path))
+    return Parser(task).parse()
+
+
+@pytest.fixture
+def log_file(log_folder) -> str:
+    return log_folder(''.join(sync_line(index) for index in range(10)) + "2019-03-12 08:01:00.000 WARN odd line\n")
+
+
+def test_sqlite_sink_writes_every_collection(log_file, tmp_path):
+    output_path = str(tmp_path / 'out.db')
+    assert parse_to('sqlite', output_path, log_file).status == ParseStatus.PARSED
+
+    connection = sqlite3.connect(output_path)
+    rows = connection.execute('SELECT document_id, date_time, is_error FROM log_data').fetchall()
+    assert sorted(row[0] for row in rows) == sorted(f"doc-{index}" for index in range(10))
+    assert rows[0][1].startswith('2019-03-12 08:00:') and rows[0][2] == 0
+    assert connection.execute('SELECT COUNT(*) FROM unparsed_data').fetchone() == (1,)
+    (file_version_id, is_parsing_complete, lines_parsed), = connection.execute(
+        'SELECT _id, is_parsing_complete, lines_parsed FROM file_version_data').fetchall()
+    assert is_parsing_complete == 1 and lines_parsed == 11
+    assert connection.execute('SELECT DISTINCT file_version_data FROM log_data').fetchall() == [(file_version_id,)]
+
+
+def test_sqlite_sink_skips_stored_ids(tmp_path):
+    sink = create_sink('sqlite', 'test', str(tmp_path / 'out.db'))
+    documents = [{'_id': ObjectId(), 'document_id': f"doc-{index}"} for index in range(3)]
+    sink.write('log_data', documents)
+    sink.write('log_data', documents + [{'document_id': 'doc-3'}, {'document_id': 'doc-4'}])
+    sink.close()
+
+    connection = sqlite3.connect(str(tmp_path / 'out.db'))
+    assert connection.execute('SELECT COUNT(*) FROM log_data').fetchone() == (5,)
+
+
+def test_sqlite_sink_appends_upserts_as_rows(tmp_path):
+    sink = create_sink('sqlite', 'test', str(tmp_path / 'out.db'))
+    update = {'$inc': {'count': 2}, '$push': {'samples': {'$each': ['a', 'b'], '$slice': 5}}}
+    sink.upsert('unparsed_pattern', [({'template': 'WARN <*>'}, update), ({'template': 'WARN <*>'}, update)])
+    sink.close()
+
+    connection = sqlite3.connect(str(tmp_path / 'out.db'))
+    assert connection.execute('SELECT template, count, samples FROM unparsed_pattern').fetchall() == \
+        [('WARN <*>', 2, '["a", "b"]')] * 2
+
+
+def test_jsonl_sink_writes_extended_json(log_file, tmp_path):
+    output_path = str(tmp_path / 'out')
+    assert parse_to('jsonl', output_path, log_file).status == ParseStatus.PARSED
+
+    def read(collection):
+        documents = []
+        for file_path in glob.glob(os.path.join(output_path, f"{collection}-*.jsonl.gz")):
+            with gzip.open(file_path, 'rt', encoding='utf-8') as reader:
+                documents += [json_util.loads(line) for line in reader]
+        return documents
+
+    rows = read('log_data')
+    assert sorted(row['document_id'] for row in rows) == sorted(f"doc-{index}" for index in range(10))
+    version, = read('file_version_data')
+    assert version['is_parsing_complete'] and version['lines_parsed'] == 11
+    assert isinstance(version['_id'], ObjectId)
+    assert {row['file_version_data'] for row in rows} == {version['_id']}
+
+
+def test_parquet_sink_writes_typed_columns(log_file, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    output_path = str(tmp_path / 'out')
+    assert parse_to('parquet', output_path, log_file).status == ParseStatus.PARSED
+
+    def read(collection):
+        return [row for file_path in glob.glob(os.path.join(output_path, f"{collection}-*.parquet"))
+                for row in pq.read_table(file_path).to_pylist()]
+
+    rows = read('log_data')
+    assert sorted(row['document_id'] for row in rows) == sorted(f"doc-{index}" for index in range(10))
+    assert rows[0]['date_time'].year == 2019 and rows[0]['is_skipped'] is False
+    version, = read('file_version_data')
+    assert version['is_parsing_complete'] and version['lines_parsed'] == 11
+    assert {row['file_version_data'] for row in rows} == {version['_id']}
+
+
+def test_local_sinks_need_an_output_path():
+    with pytest.raises(ValueError):
+        create_sink('sqlite', 'test')
@@ -0,0 +1,63 @@
+import datetime
+
+import pytest
+
+from serverdb_log_parser_multithreaded.log_parser.timestamp import TIMESTAMP_FORMAT, TimestampDecoder
+
+
+@pytest.mark.parametrize('value', [
+    "2019-03-12 10:15:42.123",
+    "2019-03-12 10:15:42.1",
+    "2019-03-12 10:15:42.123456",
+    "2019-03-12 10:15:00.000000",
+    "2019-12-31 23:59:59.999999",
+    "2020-02-29 00:00:00.5",
+])
+def test_timestamp_is_decoded_like_strptime(value):
+    assert TimestampDecoder().decode(value) == datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def test_cached_prefix_follows_the_minute():
+    decoder = TimestampDecoder()
+    values = ["2019-03-12 10:15:42.1", "2019-03-12 10:15:59.9", "2019-03-12 10:16:00.0",
+              "2019-03-13 10:16:00.0", "2019-03-12 10:15:42.2"]
+    assert [decoder.decode(value) for value in values] == \
+        [datetime.datetime.strptime(value, TIMESTAMP_FORMAT) for value in values]
+
+
+@pytest.mark.parametrize('value', [
+    # not the fixed layout, strptime still reads them
+    "2019-3-12 10:15:42.123",
+    "2019-03-12 10:15:4.123",
+    "2019-03-12 9:15:42.123",
+])
+def test_other_layouts_fall_back_to_strptime(value):
+    assert TimestampDecoder().decode(value) == datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+@pytest.mark.parametrize('value', [
+    "",
+    "2019-03-12",
+    "2019-03-12 10:15:42",
+    "2019-03-12 10:15:42.",
+    "2019-03-12 10:15:42.1234567",
+    "2019-03-12 10:15:42.12a",
+    "2019-03-12T10:15:42.123",
+    "2019-13-12 10:15:42.123",
+    "2019-02-30 10:15:42.123",
+    "2019-03-12 24:15:42.123",
+    "2019-03-12 10:15:61.123",
+])
+def test_malformed_timestamp_raises_value_error(value):
+    with pytest.raises(ValueError):
+        TimestampDecoder().decode(value)
+
+
+def test_malformed_timestamp_does_not_break_the_cache():
+    decoder = TimestampDecoder()
+    assert decoder.decode("2019-02-28 10:15:42.1") == datetime.datetime(2019, 2, 28, 10, 15, 42, 100000)
+    with pytest.raises(ValueError):
+        decoder.decode("2019-02-30 10:15:42.1")
+    with pytest.raises(ValueError):
+        decoder.decode("2019-02-30 10:15:43.1")
+    assert decoder.decode("2019-02-28 10:15:43.25") == datetime.datetime(2019, 2, 28, 10, 15, 43, 250000)